@@ -0,0 +1,151 @@
+"""Nightly adaptation sweep across all users.
+
+    python adaptation_sweep.py --workers 8 --chunk 500
+    python adaptation_sweep.py --dry-run
+
+Stage 1 finds every user whose current-week plan needs a deload: one query
+reads each active user's training_load row (the EWMA state every adherence
+save maintains) joined to the newest weekly_plans row for the week, and
+training_load.load_reasons, the rule the Today page applies on save,
+decides on that state carried forward to today. Stage 2 runs adapt_plan
+for the flagged users only, in chunks across a worker pool; each chunk
+loads its plans with one query and saves them through
+plan_store.apply_days_patch, so a plan the user changed after the scan is
+skipped rather than overwritten.
+
+The scan reads every user's rows, so it must run with a database role that
+is not restricted by the RLS policies (see database_policies.sql).
+"""
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from database import SessionLocal, TrainingLoad, WeeklyPlan
+from openai_service import adapt_plan, already_deloaded
+from plan_store import apply_days_patch
+from training_load import CHRONIC_DAYS, load_reasons, state_as_of
+
+def find_flagged(db, today):
+    """Stage 1: one query for the candidates, the Today page's rule for the decision."""
+    week_start = today - timedelta(days=today.weekday())
+    current_plans = db.query(
+        WeeklyPlan.id, WeeklyPlan.user_id, WeeklyPlan.version,
+        func.row_number().over(partition_by=WeeklyPlan.user_id,
+                               order_by=WeeklyPlan.created_at.desc()).label("rn")
+    ).filter(WeeklyPlan.week_start_date == week_start).subquery()
+    rows = db.query(TrainingLoad, current_plans.c.id, current_plans.c.version).join(
+        current_plans,
+        (current_plans.c.user_id == TrainingLoad.user_id) & (current_plans.c.rn == 1)
+    ).filter(
+        # a state untouched for a whole chronic window has decayed to nothing
+        TrainingLoad.last_date > today - timedelta(days=CHRONIC_DAYS)
+    ).all()
+
+    flagged = []
+    for state, plan_id, version in rows:
+        reasons = load_reasons(state_as_of(state, today))
+        if reasons:
+            flagged.append({
+                "user_id": state.user_id,
+                "plan_id": plan_id,
+                "version": version,
+                "reasons": reasons,
+            })
+    return flagged
+
+
+def adapt_chunk(chunk, today, dry_run=False):
+    """Stage 2 worker: adapt and save one chunk of flagged plans."""
+    stats = {"adapted": 0, "unchanged": 0, "conflicts": 0, "errors": 0}
+    db = SessionLocal()
+    try:
+        plans = db.query(WeeklyPlan).filter(
+            WeeklyPlan.id.in_([item["plan_id"] for item in chunk])
+        ).all()
+        by_id = {plan.id: plan for plan in plans}
+
+        for item in chunk:
+            plan = by_id.get(item["plan_id"])
+            if plan is None or already_deloaded(plan.plan_json, today):
+                stats["unchanged"] += 1
+                continue
+            adapted = adapt_plan(plan.plan_json, load_reasons=item["reasons"])
+            if adapted.get("status") != "ADAPTED":
+                stats["unchanged" if adapted.get("status") == "NO_CHANGE" else "errors"] += 1
+                continue
+            if dry_run:
+                stats["adapted"] += 1
+                continue
+            if apply_days_patch(db, plan, adapted["days_patch"], item["version"]) is None:
+                stats["conflicts"] += 1
+            else:
+                stats["adapted"] += 1
+
+        if not dry_run:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logging.warning(f"Adaptation chunk failed: {e}")
+        # The rollback undid the adapted plans; rows left unchanged or in
+        # conflict wrote nothing and keep their count, so the chunk's counts
+        # still add up to len(chunk)
+        stats["adapted"] = 0
+        stats["errors"] = len(chunk) - stats["unchanged"] - stats["conflicts"]
+    finally:
+        db.close()
+    return stats
+
+
+def run_sweep(today=None, workers=8, chunk_size=500, dry_run=False):
+    """Run both stages and return counts plus per-stage timings (seconds)."""
+    today = today or date.today()
+    timings = {}
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        flagged = find_flagged(db, today)
+    finally:
+        db.close()
+    timings["scan"] = time.perf_counter() - started
+
+    adapt_started = time.perf_counter()
+    totals = {"flagged": len(flagged), "adapted": 0, "unchanged": 0, "conflicts": 0, "errors": 0}
+    chunks = [flagged[i:i + chunk_size] for i in range(0, len(flagged), chunk_size)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(adapt_chunk, chunk, today, dry_run) for chunk in chunks]
+        for future in as_completed(futures):
+            for key, value in future.result().items():
+                totals[key] += value
+    timings["adapt"] = time.perf_counter() - adapt_started
+    timings["total"] = time.perf_counter() - started
+
+    return totals, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate adaptation triggers for every user")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Evaluate as of this day (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Compute adaptations without saving them")
+    args = parser.parse_args()
+
+    totals, timings = run_sweep(args.date, args.workers, args.chunk, args.dry_run)
+
+    print(f"flagged users : {totals['flagged']}")
+    print(f"adapted       : {totals['adapted']}{' (dry run)' if args.dry_run else ''}")
+    print(f"unchanged     : {totals['unchanged']}")
+    print(f"conflicts     : {totals['conflicts']}")
+    print(f"errors        : {totals['errors']}")
+    print(f"scan          : {timings['scan']:.2f} s")
+    print(f"adapt + save  : {timings['adapt']:.2f} s")
+    print(f"total         : {timings['total']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
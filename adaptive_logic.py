@@ -1,70 +1,123 @@
-from database import SessionLocal, AdherenceLog, WeeklyPlan, Pantry
-from openai_service import adapt_plan
+from database import session_scope, WeeklyPlan, Pantry, Profile, Questionnaire, Equipment, Availability
+from openai_service import adapt_plan, already_deloaded, regenerate_section
+from plan_context import user_data_version
+from plan_store import get_head_plan, apply_days_patch
+from plan_projection import remaining_ingredients as remaining_meal_ingredients
+from pantry_ledger import rebuild_ledger
+from training_load import get_load, load_reasons
+import swap_cache
+from ingredient_matcher import PantryIndex
+from substitutions import SubstitutionIndex
+from collections import OrderedDict
 from datetime import date, timedelta
 import json
+import os
+import threading
 
 
-def check_and_adapt_plan(user_id):
-    db = SessionLocal()
-    
-    try:
+ADAPTATION_MEMO_SIZE = int(os.environ.get("ADAPTATION_MEMO_SIZE", "1024"))
+
+PLAN_CONFLICT_MESSAGE = "Plan changed during adaptation, try again"
+
+_adaptation_memo = OrderedDict()
+_adaptation_memo_lock = threading.Lock()
+
+
+def _memo_get(key):
+    with _adaptation_memo_lock:
+        if key in _adaptation_memo:
+            _adaptation_memo.move_to_end(key)
+            return _adaptation_memo[key]
+    return None
+
+
+def _memo_put(key, value):
+    with _adaptation_memo_lock:
+        _adaptation_memo[key] = value
+        _adaptation_memo.move_to_end(key)
+        while len(_adaptation_memo) > ADAPTATION_MEMO_SIZE:
+            _adaptation_memo.popitem(last=False)
+
+
+def on_adherence_saved(user_id, plan_id, plan_version, trigger_kinds, triggers):
+    """Single adaptation evaluation for everything one adherence save raised.
+
+    ``triggers`` is the full list of reasons collected from the save (see
+    training_load.load_reasons); they are evaluated together in one
+    check_and_adapt_plan call. Results are memoized by the decision inputs:
+    the trigger kinds (training_load.load_triggers) and the plan (id and
+    version), whose content says whether the upcoming days are already
+    adapted. Editing a logged day or logging a new one that raises the same
+    triggers against the same plan reuses the decision instead of adapting
+    again. An adapted plan is also recorded under its new version, since
+    that is the version the next rerun will see.
+    """
+    key = (user_id, plan_id, plan_version, frozenset(trigger_kinds))
+    cached = _memo_get(key)
+    if cached is not None:
+        return cached
+
+    if not triggers:
+        result = (None, "No adaptation needed")
+    else:
+        result = check_and_adapt_plan(user_id, triggers)
+
+    adapted = result[0]
+    if result[1] == PLAN_CONFLICT_MESSAGE or (adapted and adapted.get("status") == "ERROR"):
+        # Transient; let the next save try again
+        return result
+    _memo_put(key, result)
+    if adapted and adapted.get("plan_version") is not None:
+        _memo_put((user_id, plan_id, adapted["plan_version"], frozenset(trigger_kinds)), result)
+    return result
+
+
+def check_and_adapt_plan(user_id, adaptation_reasons=None):
+    """Adapt and save the current week's plan when the training-load state calls for it.
+
+    The decision reads the user's TrainingLoad row (kept up to date on every
+    adherence save) instead of re-scanning recent logs; callers that already
+    hold the triggers pass them as ``adaptation_reasons``.
+    """
+    with session_scope(user_id) as db:
+        if adaptation_reasons is None:
+            adaptation_reasons = load_reasons(get_load(db, user_id))
+        if not adaptation_reasons:
+            return None, "No adaptation needed"
+        
         current_week_start = date.today() - timedelta(days=date.today().weekday())
         
-        plan = db.query(WeeklyPlan).filter(
-            WeeklyPlan.user_id == user_id,
-            WeeklyPlan.week_start_date == current_week_start
-        ).order_by(WeeklyPlan.created_at.desc()).first()
+        plan = get_head_plan(db, user_id, current_week_start)
         
         if not plan:
             return None, "No current week plan found"
         
-        recent_logs = db.query(AdherenceLog).filter(
-            AdherenceLog.user_id == user_id,
-            AdherenceLog.date >= current_week_start
-        ).order_by(AdherenceLog.date.desc()).limit(3).all()
-        
-        needs_adaptation = False
-        adaptation_reasons = []
-        
-        high_soreness_count = sum(1 for log in recent_logs if log.soreness and log.soreness >= 8)
-        if high_soreness_count >= 2:
-            needs_adaptation = True
-            adaptation_reasons.append("High soreness detected in recent workouts")
-        
-        high_rpe_count = sum(1 for log in recent_logs if log.rpe and log.rpe >= 9)
-        if high_rpe_count >= 2:
-            needs_adaptation = True
-            adaptation_reasons.append("Consistently high RPE indicating potential overtraining")
-        
-        if needs_adaptation:
-            adherence_data = [
-                {
-                    "date": str(log.date),
-                    "workout_done": log.workout_done,
-                    "rpe": log.rpe,
-                    "soreness": log.soreness,
-                    "meals_done": log.meals_done
-                }
-                for log in recent_logs
-            ]
-            
+        for _ in range(2):
+            # A deload is applied once; further triggers must not shrink it again
+            if already_deloaded(plan.plan_json, date.today()):
+                return None, "Upcoming workouts already reduced for recovery"
             adapted = adapt_plan(
                 current_plan=plan.plan_json,
-                adherence_logs=adherence_data
+                load_reasons=adaptation_reasons
             )
+            if adapted.get("status") != "ADAPTED":
+                return adapted, adaptation_reasons
             
-            return adapted, adaptation_reasons
+            new_version = apply_days_patch(db, plan, adapted["days_patch"], plan.version)
+            if new_version is not None:
+                db.commit()
+                adapted["plan_version"] = new_version
+                return adapted, adaptation_reasons
+            
+            # Another adaptation landed first; adapt the new head once more
+            db.rollback()
+            db.refresh(plan)
         
-        return None, "No adaptation needed"
-    
-    finally:
-        db.close()
+        return None, PLAN_CONFLICT_MESSAGE
 
 
 def check_pantry_depletion(user_id):
-    db = SessionLocal()
-    
-    try:
+    with session_scope(user_id) as db:
         pantry = db.query(Pantry).filter(
             Pantry.user_id == user_id
         ).first()
@@ -72,47 +125,73 @@ def check_pantry_depletion(user_id):
         if not pantry:
             return None, []
         
-        current_items = pantry.items_json.get("items", [])
-        item_names = [item["name"].lower() for item in current_items]
+        pantry_index = PantryIndex(pantry.items_json.get("items", []))
         
         current_week_start = date.today() - timedelta(days=date.today().weekday())
         
-        plan = db.query(WeeklyPlan).filter(
-            WeeklyPlan.user_id == user_id,
-            WeeklyPlan.week_start_date == current_week_start
-        ).order_by(WeeklyPlan.created_at.desc()).first()
-        
-        if not plan:
-            return None, []
-        
-        missing_ingredients = []
-        plan_data = plan.plan_json
-        
-        for day in plan_data.get("days", []):
-            day_date = date.fromisoformat(day.get("date"))
-            if day_date < date.today():
-                continue
-            
-            for meal in day.get("meals", []):
-                for ingredient in meal.get("ingredients", []):
-                    ingredient_lower = ingredient.lower()
-                    found = any(ingredient_lower in item_name or item_name in ingredient_lower 
-                              for item_name in item_names)
-                    if not found and ingredient not in missing_ingredients:
-                        missing_ingredients.append(ingredient)
+        remaining_ingredients = remaining_meal_ingredients(
+            db, user_id, date.today(), current_week_start + timedelta(days=7)
+        )
+        missing_ingredients = pantry_index.missing(remaining_ingredients)
         
         return pantry, missing_ingredients
-    
-    finally:
-        db.close()
 
 
-def suggest_meal_swap(missing_ingredient, available_items, meal_context):
+def suggest_meal_swap(missing_ingredient, available_items, meal_context, diet_type=None, allergens=None):
+    """Suggest a swap for one missing ingredient, locally or from swap_cache when possible."""
+    return suggest_meal_swaps([(missing_ingredient, meal_context)], available_items,
+                              diet_type=diet_type, allergens=allergens)[
+        (missing_ingredient, swap_cache.meal_type_of(meal_context))
+    ]
+
+
+def suggest_meal_swaps(missing_ingredients, available_items, meal_context="", diet_type=None, allergens=None):
+    """Batched swap suggestions for every missing ingredient of a plan.
+
+    missing_ingredients: list of ingredient strings or (ingredient, meal_context)
+    tuples. Each ingredient is first matched against the pantry by nutrient
+    similarity (substitutions.py), honouring the questionnaire's diet type
+    and allergens. The rest go through one batched cache lookup, and the
+    model is only asked about the remaining misses. Returns
+    {(ingredient, meal_type): suggestion}, meal_type as swap_cache.meal_type_of
+    gives it, so the same ingredient missing from breakfast and from dinner
+    gets a suggestion for each.
+    """
+    local = SubstitutionIndex(available_items, diet_type, allergens)
+    results = {}
+    requested = []
+    fingerprint = None
+    for entry in missing_ingredients:
+        ingredient, context = entry if isinstance(entry, tuple) else (entry, meal_context)
+        meal_type = swap_cache.meal_type_of(context)
+        suggestion = local.suggest(ingredient)
+        if suggestion is not None:
+            results[(ingredient, meal_type)] = suggestion
+            continue
+        fingerprint = fingerprint or swap_cache.pantry_fingerprint(available_items)
+        key = swap_cache.make_key(ingredient, fingerprint, meal_type)
+        requested.append((ingredient, meal_type, context, key))
+
+    if not requested:
+        return results
+
+    cached = swap_cache.get_many([key for _, _, _, key in requested])
+
+    for ingredient, meal_type, context, key in requested:
+        if key not in cached:
+            suggestion = _ask_model_for_swap(ingredient, available_items, context)
+            if "error" not in suggestion:
+                swap_cache.put(key, suggestion)
+            cached[key] = suggestion
+        results[(ingredient, meal_type)] = cached[key]
+    return results
+
+
+def _ask_model_for_swap(missing_ingredient, available_items, meal_context):
     import google.generativeai as genai
-    import os
+    from openai_service import configure_genai
     
-    GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-    genai.configure(api_key=GOOGLE_API_KEY)
+    configure_genai()
     
     system_prompt = """You are a nutrition expert. Suggest a recipe swap that uses available pantry items 
     while maintaining similar macros and meal type (breakfast/lunch/dinner)."""
@@ -153,16 +232,47 @@ Suggest a suitable replacement ingredient or alternative meal using available it
         return {"error": str(e)}
 
 
+def load_input_data(db, user_id, week_start):
+    """Build the INPUT_CONTRACT_V1 payload from a user's stored setup rows.
+
+    Returns (input_data, data_version), or (None, None) if setup is incomplete.
+    """
+    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    questionnaire = db.query(Questionnaire).filter(Questionnaire.user_id == user_id).first()
+    equipment = db.query(Equipment).filter(Equipment.user_id == user_id).first()
+    pantry = db.query(Pantry).filter(Pantry.user_id == user_id).first()
+    availability = db.query(Availability).filter(Availability.user_id == user_id).first()
+    if not (profile and questionnaire and equipment and pantry and availability):
+        return None, None
+
+    input_data = {
+        "user": {"id": user_id, "email": profile.email},
+        "questionnaire": {
+            "bio_json": questionnaire.bio_json,
+            "goals_json": questionnaire.goals_json,
+            "diet_json": questionnaire.diet_json,
+            "allergens_json": questionnaire.allergens_json,
+            "cuisine_json": questionnaire.cuisine_json,
+            "work_hours_json": questionnaire.work_hours_json,
+            "gym_frequency": questionnaire.gym_frequency,
+            "grocery_frequency": questionnaire.grocery_frequency,
+            "reminder_prefs_json": questionnaire.reminder_prefs_json
+        },
+        "equipment": equipment.items_json,
+        "pantry": pantry.items_json,
+        "availability": availability.free_blocks_json,
+        "week_start": str(week_start),
+        "timezone": profile.timezone
+    }
+    return input_data, user_data_version(questionnaire, equipment, pantry, availability)
+
+
 def auto_replan_after_pantry_update(user_id):
-    db = SessionLocal()
-    
-    try:
+    """Regenerate only the meals of the remaining days until the next shopping trip."""
+    with session_scope(user_id) as db:
         current_week_start = date.today() - timedelta(days=date.today().weekday())
         
-        plan = db.query(WeeklyPlan).filter(
-            WeeklyPlan.user_id == user_id,
-            WeeklyPlan.week_start_date == current_week_start
-        ).order_by(WeeklyPlan.created_at.desc()).first()
+        plan = get_head_plan(db, user_id, current_week_start)
         
         if not plan:
             return None, "No current plan"
@@ -174,23 +284,41 @@ def auto_replan_after_pantry_update(user_id):
         if not pantry:
             return None, "No pantry data"
         
+        if pantry.next_shopping_date is None:
+            return None, "No next shopping date set"
+        
         days_until_next_shopping = (pantry.next_shopping_date - date.today()).days
         
         if days_until_next_shopping <= 0:
             return None, "Shopping day has passed"
         
-        pantry_delta = {
-            "items": pantry.items_json.get("items", []),
-            "days_until_shopping": days_until_next_shopping
-        }
+        last_day = min(pantry.next_shopping_date, current_week_start + timedelta(days=6))
+        dates = [
+            day["date"] for day in plan.plan_json.get("days", [])
+            if day.get("date") and str(date.today()) <= day["date"] <= str(last_day)
+        ]
+        if not dates:
+            return None, "No remaining days to replan this week"
         
-        adapted = adapt_plan(
-            current_plan=plan.plan_json,
-            adherence_logs=[],
-            pantry_delta=pantry_delta
+        input_data, data_version = load_input_data(db, user_id, current_week_start)
+        if input_data is None:
+            return None, "Setup incomplete"
+        
+        adapted = regenerate_section(
+            input_data,
+            plan.plan_json,
+            "meals",
+            dates,
+            reason="Using updated pantry items",
+            data_version=data_version
         )
+        if adapted.get("status") != "OK":
+            return adapted, "Meal replan failed"
         
-        return adapted, f"Replanned meals for next {days_until_next_shopping} days based on updated pantry"
-    
-    finally:
-        db.close()
+        if apply_days_patch(db, plan, adapted["days_patch"], plan.version) is None:
+            db.rollback()
+            return None, "Plan changed during replan, try again"
+        rebuild_ledger(db, user_id)
+        db.commit()
+        
+        return adapted, f"Replanned meals for next {len(dates)} days based on updated pantry"
@@ -1,8 +1,5 @@
 import streamlit as st
-from database import (
-    init_db, get_or_create_profile, SessionLocal,
-    Questionnaire, Equipment, Pantry, Availability, WeeklyPlan
-)
+from database import init_db, get_setup_status
 from nav import apply_global_ui, top_nav
 
 # Apply global UI settings
@@ -15,12 +12,15 @@ if "authenticated" not in st.session_state or not st.session_state.authenticated
     exec(open("pages/00_login.py", encoding="utf-8").read())
     st.stop()
 
-# User is authenticated, continue with the app
-get_or_create_profile(
-    user_id=st.session_state.user_id,
-    email=st.session_state.email,
-    timezone=st.session_state.timezone
-)
+# User is authenticated, continue with the app. Profile and setup progress
+# are cached for the session; setup pages drop "setup_status" when they save.
+if "setup_status" not in st.session_state:
+    st.session_state.setup_status = get_setup_status(
+        user_id=st.session_state.user_id,
+        email=st.session_state.email,
+        timezone=st.session_state.timezone
+    )
+profile, user_progress = st.session_state.setup_status
 
 # Add top navigation
 top_nav(is_authed=True, current="Home")
@@ -35,17 +35,6 @@ with user_info:
     </div>
     """, unsafe_allow_html=True)
 
-# Check user progress
-db = SessionLocal()
-user_progress = {
-    'onboarding': db.query(Questionnaire).filter(Questionnaire.user_id == st.session_state.user_id).first() is not None,
-    'equipment': db.query(Equipment).filter(Equipment.user_id == st.session_state.user_id).first() is not None,
-    'pantry': db.query(Pantry).filter(Pantry.user_id == st.session_state.user_id).first() is not None,
-    'schedule': db.query(Availability).filter(Availability.user_id == st.session_state.user_id).first() is not None,
-    'weekly_plan': db.query(WeeklyPlan).filter(WeeklyPlan.user_id == st.session_state.user_id).first() is not None
-}
-db.close()
-
 # Main hero section with brand and clear value prop
 st.markdown("""
 <div style='padding: 2rem; margin-bottom: 2rem; border-radius: 10px; background: rgba(0,0,0,0.2);'>
@@ -0,0 +1,124 @@
+"""Benchmark generate_weekly_plan / regenerate_day / regenerate_section against the local stand-in.
+
+Starts fake_google_api in-process (unless --endpoint is given), points
+openai_service at it and drives the generators at a chosen concurrency.
+
+    python bench_generation.py --requests 200 --concurrency 16 \\
+        --latency lognormal:6.5,0.4 --rate-429 0.02 --rate-malformed 0.01
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+SAMPLE_INPUT = {
+    "user": {"id": "bench_user", "email": "bench@example.com"},
+    "questionnaire": {
+        "bio_json": {"age": 30, "injuries": []},
+        "goals_json": {"weight_goal": "Maintain"},
+        "diet_json": {"type": "Omnivore"},
+        "allergens_json": [],
+        "cuisine_json": {"preferences": []},
+        "work_hours_json": {"start": "09:00", "end": "17:00"},
+        "gym_frequency": "never",
+        "grocery_frequency": "weekly",
+        "reminder_prefs_json": {},
+    },
+    "equipment": {"items": ["Dumbbells", "Yoga Mat"]},
+    "pantry": {"items": [{"name": "Rice", "qty_unit": "1kg"}, {"name": "Eggs", "qty_unit": "12"}]},
+    "availability": {"free_blocks": [{"day": "Monday", "start": "18:00", "end": "19:00"}]},
+    "week_start": "2025-01-06",
+    "timezone": "UTC",
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def run(kind, total, concurrency):
+    from openai_service import generate_weekly_plan, regenerate_day, regenerate_section
+    from fake_google_api import synthetic_response
+
+    current_plan = json.loads(synthetic_response(f"Generate a weekly plan starting {SAMPLE_INPUT['week_start']}"))
+    remaining_dates = [d["date"] for d in current_plan["days"][2:]]
+
+    def one(i):
+        start = time.perf_counter()
+        if kind == "plan":
+            result = generate_weekly_plan(SAMPLE_INPUT)
+            status = result.get("status", "OK")
+        elif kind == "meals":
+            result = regenerate_section(SAMPLE_INPUT, current_plan, "meals", remaining_dates,
+                                        reason="benchmark", data_version="bench")
+            status = result.get("status", "OK")
+        else:
+            result = regenerate_day(SAMPLE_INPUT, "2025-01-08", reason="benchmark", data_version="bench")
+            status = result.get("status", "OK")
+        return time.perf_counter() - start, status
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = [lat * 1000 for lat, _ in results]
+    statuses = Counter(status for _, status in results)
+    print(f"\n== {kind}: {total} requests @ concurrency {concurrency} ==")
+    print(f"throughput : {total / wall:.1f} req/s (wall {wall:.2f}s)")
+    print(f"latency ms : mean {statistics.mean(latencies):.1f}  p50 {percentile(latencies, 50):.1f}  "
+          f"p95 {percentile(latencies, 95):.1f}  p99 {percentile(latencies, 99):.1f}  max {max(latencies):.1f}")
+    print(f"statuses   : {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the plan generation pipeline")
+    parser.add_argument("--endpoint", default=None, help="Use an already running stand-in (host:port)")
+    parser.add_argument("--kind", choices=["plan", "day", "meals", "all"], default="all")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["synthetic", "replay"], default="synthetic")
+    parser.add_argument("--cassette", default="fake_google_api.jsonl")
+    parser.add_argument("--latency", default="lognormal:6.0,0.5")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-truncate", type=float, default=0.0)
+    parser.add_argument("--rate-malformed", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        from fake_google_api import make_server
+
+        server = make_server(port=0, mode=args.mode, cassette_path=args.cassette, latency=args.latency,
+                             rate_429=args.rate_429, rate_truncate=args.rate_truncate,
+                             rate_malformed=args.rate_malformed)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Must be set before openai_service is imported
+    os.environ["GENAI_API_ENDPOINT"] = endpoint
+    os.environ["VISION_API_URL"] = f"{endpoint}/v1/images:annotate"
+    os.environ.setdefault("GOOGLE_API_KEY", "bench-key")
+    os.environ.setdefault("GEMINI_MODEL", "gemini-2.0-flash-exp")
+
+    try:
+        kinds = ["plan", "day", "meals"] if args.kind == "all" else [args.kind]
+        for kind in kinds:
+            run(kind, args.requests, args.concurrency)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
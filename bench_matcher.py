@@ -0,0 +1,92 @@
+"""Benchmark the pantry matcher against the old substring scan.
+
+    python bench_matcher.py --pantry 2000 --meals 5 --ingredients 8
+"""
+import argparse
+import random
+import time
+
+from ingredient_matcher import PantryIndex
+
+FOODS = [
+    "rice", "basmati rice", "oats", "quinoa", "chicken breast", "chicken thigh", "ground beef",
+    "salmon", "tuna", "tofu", "tempeh", "eggs", "milk", "greek yogurt", "cheddar cheese",
+    "olive oil", "coconut oil", "butter", "bread", "pasta", "lentils", "black beans",
+    "chickpeas", "spinach", "broccoli", "carrots", "tomatoes", "onions", "garlic",
+    "bell peppers", "sweet potatoes", "potatoes", "bananas", "apples", "blueberries",
+    "peanut butter", "almonds", "honey", "avocado", "cucumber", "mushrooms", "zucchini",
+]
+ADJECTIVES = ["fresh", "organic", "frozen", "smoked", "wild", "low fat", "whole grain", "red", "green", "baby"]
+UNITS = ["g", "ml", "cup", "tbsp", "pieces"]
+
+
+def make_pantry(size, rng):
+    items = []
+    for i in range(size):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(FOODS)}"
+        if i >= len(FOODS) * len(ADJECTIVES):
+            name += f" brand{i}"
+        items.append({"name": name.title(), "qty_unit": f"{rng.randint(1, 900)}g"})
+    return items
+
+
+def make_plan_ingredients(days, meals, per_meal, rng):
+    extras = ["quinoa", "kale", "feta", "boiled eggs", "dark chocolate", "oil"]
+    ingredients = []
+    for _ in range(days * meals * per_meal):
+        food = rng.choice(FOODS + extras)
+        ingredients.append(f"{food} ({rng.randint(10, 300)} {rng.choice(UNITS)})")
+    return ingredients
+
+
+def naive_missing(ingredients, pantry_items):
+    item_names = [item["name"].lower() for item in pantry_items]
+    missing = []
+    for ingredient in ingredients:
+        ingredient_lower = ingredient.lower()
+        found = any(ingredient_lower in item_name or item_name in ingredient_lower for item_name in item_names)
+        if not found and ingredient not in missing:
+            missing.append(ingredient)
+    return missing
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingredient-to-pantry matching")
+    parser.add_argument("--pantry", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--meals", type=int, default=5)
+    parser.add_argument("--ingredients", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pantry = make_pantry(args.pantry, rng)
+    ingredients = make_plan_ingredients(args.days, args.meals, args.ingredients, rng)
+
+    naive_ms, naive = timed(lambda: naive_missing(ingredients, pantry), args.repeat)
+    build_ms, index = timed(lambda: PantryIndex(pantry), args.repeat)
+    # a fresh index per run so the lookups are not served from its memo
+    fresh = [PantryIndex(pantry) for _ in range(args.repeat)]
+    lookup_ms, indexed = timed(lambda: fresh.pop().missing(ingredients), args.repeat)
+
+    print(f"pantry items        : {len(pantry)}")
+    print(f"plan ingredients    : {len(ingredients)}")
+    print(f"substring scan      : {naive_ms:.2f} ms ({len(naive)} missing)")
+    print(f"index build         : {build_ms:.2f} ms")
+    print(f"index match         : {lookup_ms:.2f} ms ({len(indexed)} missing)")
+    print(f"per lookup          : {lookup_ms * 1000 / len(ingredients):.2f} us")
+
+
+if __name__ == "__main__":
+    main()
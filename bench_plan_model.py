@@ -0,0 +1,82 @@
+"""Benchmark the slot-based plan model against the plain dict form.
+
+    python bench_plan_model.py --plans 2000
+
+Reports parse time, retained memory per plan and the cost of a typical
+walk (remaining ingredients from mid-week) for both representations.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from fake_google_api import synthetic_response
+from plan_model import parse_plan
+
+
+def retained_bytes(build, count):
+    """Bytes still allocated per item while ``count`` results of build() are alive."""
+    gc.collect()
+    tracemalloc.start()
+    kept = [build() for _ in range(count)]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return retained / count
+
+
+def walk_dict(plan, start):
+    return [
+        ing
+        for day in plan.get("days", [])
+        if day.get("date", "") >= start
+        for meal in day.get("meals", [])
+        for ing in meal.get("ingredients", [])
+    ]
+
+
+def walk_model(plan, start):
+    return [ing for day in plan.days_from(start) for ing in day.ingredients()]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plan_model vs dict plans")
+    parser.add_argument("--plans", type=int, default=2000)
+    parser.add_argument("--walks", type=int, default=20000)
+    args = parser.parse_args()
+
+    raw = synthetic_response("Create a weekly plan starting 2025-01-06")
+    doc = json.loads(raw)
+    assert parse_plan(doc).to_dict() == doc, "round trip changed the plan"
+
+    loads_s = timed(lambda: json.loads(raw), args.plans)
+    loads_parse_s = timed(lambda: parse_plan(json.loads(raw)), args.plans)
+    parse_s = timed(lambda: parse_plan(doc), args.plans)
+    dict_b = retained_bytes(lambda: json.loads(raw), args.plans)
+    model_b = retained_bytes(lambda: parse_plan(json.loads(raw)), args.plans)
+
+    plan = parse_plan(doc)
+    start = doc["days"][3]["date"]
+    walk_dict_s = timed(lambda: walk_dict(doc, start), args.walks)
+    walk_model_s = timed(lambda: walk_model(plan, start), args.walks)
+
+    print(f"plans                  : {args.plans}")
+    print(f"json.loads             : {loads_s * 1e6:8.1f} us/plan")
+    print(f"json.loads + parse     : {loads_parse_s * 1e6:8.1f} us/plan")
+    print(f"parse from dict        : {parse_s * 1e6:8.1f} us/plan")
+    print(f"memory, dict           : {dict_b / 1024:8.1f} KiB/plan")
+    print(f"memory, model          : {model_b / 1024:8.1f} KiB/plan")
+    print(f"walk (dict .get)       : {walk_dict_s * 1e6:8.2f} us")
+    print(f"walk (model)           : {walk_model_s * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
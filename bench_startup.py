@@ -0,0 +1,89 @@
+"""Compare cold and warm startup cost of the schema gate and the home page.
+
+    python bench_startup.py --runs 20
+
+Schema: times the old per-run create_all() + upgrade(), the first
+init_db() call of a process (cold: one is_current() query against an
+up-to-date database) and later calls (warm: the module latch). Page: if
+Streamlit is installed, runs app.py through streamlit.testing's AppTest as
+a signed-in user: the first run after resetting the schema latch (cold)
+vs the following runs (warm).
+Needs DATABASE_URL pointing at an initialized database.
+"""
+import argparse
+import statistics
+import time
+
+import database
+from migrate import upgrade
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def cold_init():
+    database._schema_ready = False
+    database.init_db()
+
+
+def page_latency(runs, user_id, email):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None
+
+    def run_page():
+        app = AppTest.from_file("app.py", default_timeout=60)
+        app.session_state["authenticated"] = True
+        app.session_state["user_id"] = user_id
+        app.session_state["email"] = email
+        app.session_state["timezone"] = "UTC"
+        app.run()
+
+    database._schema_ready = False
+    cold = timed(run_page, 1)
+    warm = timed(run_page, runs)
+    return cold, warm
+
+
+def report(label, samples):
+    ms = [s * 1000 for s in samples]
+    if len(ms) == 1:
+        print(f"{label:34}: {ms[0]:9.2f} ms")
+    else:
+        print(f"{label:34}: median {statistics.median(ms):9.3f} ms   max {max(ms):9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark schema gate and page startup")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--user-id", default="bench_startup_user")
+    parser.add_argument("--email", default="bench_startup@example.com")
+    args = parser.parse_args()
+
+    database.init_db(force=True)
+
+    legacy = timed(lambda: (database.Base.metadata.create_all(bind=database.engine), upgrade(database.engine)), args.runs)
+    cold = timed(cold_init, args.runs)
+    warm = timed(database.init_db, args.runs)
+
+    report("schema, create_all per run (old)", legacy)
+    report("schema, init_db cold", cold)
+    report("schema, init_db warm", warm)
+
+    pages = page_latency(args.runs, args.user_id, args.email)
+    if pages is None:
+        print("page latency                      : skipped (streamlit not installed)")
+    else:
+        report("home page, cold", pages[0])
+        report("home page, warm", pages[1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Concurrent saves of the same per-user documents: query-then-insert vs upsert.
+
+    python bench_upserts.py --threads 8 --writes 25
+
+Each thread saves the bench user's Equipment row and today's adherence log
+--writes times, each save in its own session, the way two browser tabs or a
+double-clicked Save button would. The old pattern ("query the row, update it
+if found, add it otherwise") is run first, then database.upsert_user_doc /
+upsert_adherence_log. For each it reports:
+
+  errors      saves that raised (duplicate-key IntegrityError for the old pattern)
+  rows        rows left per key (must be 1)
+  lost        saves that committed but whose value is not what the row held
+              right after (upsert returns the row it wrote, so this is 0)
+  final ok    whether the row ends up holding a value some save committed
+
+check() asserts the upsert run's result: exactly one row per key, no
+errors, every save committed and none lost. The script exits non-zero with
+the failed assertion if it does not hold.
+Needs DATABASE_URL; the bench user's rows are deleted afterwards.
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from datetime import date
+
+from sqlalchemy.exc import DBAPIError
+
+from database import (
+    init_db, session_scope, get_or_create_profile, upsert_user_doc, upsert_adherence_log,
+    Equipment, AdherenceLog
+)
+
+
+def legacy_save(db, user_id, tag):
+    equipment = db.query(Equipment).filter(Equipment.user_id == user_id).first()
+    if equipment:
+        equipment.items_json = {"items": [tag]}
+    else:
+        equipment = Equipment(user_id=user_id, items_json={"items": [tag]})
+        db.add(equipment)
+    log = db.query(AdherenceLog).filter(AdherenceLog.user_id == user_id, AdherenceLog.date == date.today()).first()
+    if log:
+        log.notes = tag
+    else:
+        log = AdherenceLog(user_id=user_id, date=date.today(), notes=tag)
+        db.add(log)
+    db.flush()
+    return equipment.items_json["items"][0], log.notes
+
+
+def upsert_save(db, user_id, tag):
+    equipment = upsert_user_doc(db, Equipment, user_id, items_json={"items": [tag]})
+    log = upsert_adherence_log(db, user_id, date.today(), notes=tag)
+    return equipment.items_json["items"][0], log.notes
+
+
+def clear(user_id):
+    with session_scope(user_id) as db:
+        db.query(Equipment).filter(Equipment.user_id == user_id).delete()
+        db.query(AdherenceLog).filter(AdherenceLog.user_id == user_id).delete()
+        db.commit()
+
+
+def run(save, user_id, threads, writes):
+    clear(user_id)
+    start = threading.Barrier(threads)
+    lock = threading.Lock()
+    committed, errors, lost, samples = [], [], [], []
+
+    def worker(n):
+        start.wait()
+        for i in range(writes):
+            tag = f"w{n}-{i}"
+            started = time.perf_counter()
+            try:
+                with session_scope(user_id) as db:
+                    written = save(db, user_id, tag)
+                    db.commit()
+            except DBAPIError as e:
+                with lock:
+                    errors.append(type(e.orig).__name__)
+                continue
+            with lock:
+                samples.append(time.perf_counter() - started)
+                committed.append(tag)
+                if written != (tag, tag):
+                    lost.append(tag)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    with session_scope(user_id) as db:
+        equipment = db.query(Equipment).filter(Equipment.user_id == user_id).all()
+        logs = db.query(AdherenceLog).filter(
+            AdherenceLog.user_id == user_id, AdherenceLog.date == date.today()
+        ).all()
+        final_ok = (
+            len(equipment) == 1 and len(logs) == 1
+            and equipment[0].items_json["items"][0] in committed and logs[0].notes in committed
+        )
+        return {
+            "errors": errors,
+            "rows": (len(equipment), len(logs)),
+            "lost": lost,
+            "saves": len(committed),
+            "final_ok": final_ok,
+            "median_ms": statistics.median(samples) * 1000 if samples else float("nan"),
+        }
+
+
+def check(result, threads, writes):
+    """Assert the concurrency guarantees of an upsert run."""
+    assert result["rows"] == (1, 1), f"expected one row per key, found {result['rows']}"
+    assert not result["errors"], f"{len(result['errors'])} saves raised: {', '.join(sorted(set(result['errors'])))}"
+    assert result["saves"] == threads * writes, f"{result['saves']} of {threads * writes} saves committed"
+    assert not result["lost"], f"{len(result['lost'])} saves returned a row they did not write"
+    assert result["final_ok"], "the row holds a value no save committed"
+
+
+def report(label, result):
+    kinds = ", ".join(sorted(set(result["errors"]))) or "-"
+    print(f"{label:18}: errors {len(result['errors']):4d} ({kinds})   rows {result['rows']}   "
+          f"lost {len(result['lost']):4d}   final ok {result['final_ok']}   "
+          f"median save {result['median_ms']:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent per-user document saves: query-then-insert vs upsert")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=25, help="Saves per thread")
+    parser.add_argument("--user-id", default="bench_upserts_user")
+    parser.add_argument("--email", default="bench_upserts@example.com")
+    args = parser.parse_args()
+
+    init_db()
+    get_or_create_profile(args.user_id, args.email)
+    try:
+        report("query-then-insert", run(legacy_save, args.user_id, args.threads, args.writes))
+        result = run(upsert_save, args.user_id, args.threads, args.writes)
+        report("upsert", result)
+    finally:
+        clear(args.user_id)
+
+    try:
+        check(result, args.threads, args.writes)
+    except AssertionError as e:
+        sys.exit(f"upsert check failed: {e}")
+    print("upsert check passed")
+
+
+if __name__ == "__main__":
+    main()
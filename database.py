@@ -1,9 +1,14 @@
 import os
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, Text, DateTime, Date, JSON, ForeignKey, text
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, Column, String, Integer, Float, Boolean, Text, DateTime, Date, JSON, LargeBinary, ForeignKey, UniqueConstraint, Index, exists, literal, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 from dotenv import load_dotenv
+from migrate import upgrade, is_current
+from db_monitor import track_connections
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,16 +18,33 @@ DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set. Please set it to your Supabase connection string.")
 
-engine = create_engine(DATABASE_URL)
+# Pool sizing per app process. Keep pool_size + max_overflow across all
+# processes under the server's (or PgBouncer's) connection limit.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+)
+track_connections(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Documents are jsonb on Postgres (parsed once on write, indexable, queried
+# with @> in SQL); other dialects keep plain JSON
+JSONDoc = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Profile(Base):
     __tablename__ = "profiles"
     
     user_id = Column(String, primary_key=True)
-    email = Column(String, nullable=False)
+    email = Column(String, nullable=False, index=True)
     timezone = Column(String, nullable=False, default="UTC")
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -33,6 +55,7 @@ class Profile(Base):
     weekly_plans = relationship("WeeklyPlan", back_populates="profile")
     adherence_logs = relationship("AdherenceLog", back_populates="profile")
     reminders = relationship("Reminder", back_populates="profile")
+    training_load = relationship("TrainingLoad", back_populates="profile", uselist=False)
 
 
 class Questionnaire(Base):
@@ -40,15 +63,15 @@ class Questionnaire(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("profiles.user_id"), unique=True, nullable=False)
-    bio_json = Column(JSON, nullable=False)
-    goals_json = Column(JSON, nullable=False)
-    diet_json = Column(JSON, nullable=False)
-    allergens_json = Column(JSON, nullable=False)
-    cuisine_json = Column(JSON, nullable=False)
-    work_hours_json = Column(JSON, nullable=False)
+    bio_json = Column(JSONDoc, nullable=False)
+    goals_json = Column(JSONDoc, nullable=False)
+    diet_json = Column(JSONDoc, nullable=False)
+    allergens_json = Column(JSONDoc, nullable=False)
+    cuisine_json = Column(JSONDoc, nullable=False)
+    work_hours_json = Column(JSONDoc, nullable=False)
     gym_frequency = Column(String, nullable=False)
     grocery_frequency = Column(String, nullable=False)
-    reminder_prefs_json = Column(JSON, nullable=False)
+    reminder_prefs_json = Column(JSONDoc, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     profile = relationship("Profile", back_populates="questionnaire")
@@ -59,7 +82,7 @@ class Equipment(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("profiles.user_id"), unique=True, nullable=False)
-    items_json = Column(JSON, nullable=False)
+    items_json = Column(JSONDoc, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     profile = relationship("Profile", back_populates="equipment")
@@ -67,10 +90,14 @@ class Equipment(Base):
 
 class Pantry(Base):
     __tablename__ = "pantry"
+    __table_args__ = (
+        Index("ix_pantry_items_json_gin", "items_json",
+              postgresql_using="gin", postgresql_ops={"items_json": "jsonb_path_ops"}),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("profiles.user_id"), unique=True, nullable=False)
-    items_json = Column(JSON, nullable=False)
+    items_json = Column(JSONDoc, nullable=False)
     last_shopping_date = Column(Date, nullable=True)
     next_shopping_date = Column(Date, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -83,7 +110,7 @@ class Availability(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("profiles.user_id"), unique=True, nullable=False)
-    free_blocks_json = Column(JSON, nullable=False)
+    free_blocks_json = Column(JSONDoc, nullable=False)
     calendar_connected = Column(Boolean, default=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -92,18 +119,114 @@ class Availability(Base):
 
 class WeeklyPlan(Base):
     __tablename__ = "weekly_plans"
+    __table_args__ = (
+        Index("ix_weekly_plans_user_week_created", "user_id", "week_start_date", "created_at"),
+        Index("ix_weekly_plans_plan_json_gin", "plan_json",
+              postgresql_using="gin", postgresql_ops={"plan_json": "jsonb_path_ops"}),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
     week_start_date = Column(Date, nullable=False)
-    plan_json = Column(JSON, nullable=False)
+    # Materialized head of the plan's version chain (see plan_store.py)
+    plan_json = Column(JSONDoc, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     profile = relationship("Profile", back_populates="weekly_plans")
+    versions = relationship("PlanVersion", back_populates="plan", order_by="PlanVersion.version")
+
+
+class PlanVersion(Base):
+    __tablename__ = "plan_versions"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    plan_id = Column(Integer, ForeignKey("weekly_plans.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    # A base row stores the full plan document; a delta row stores JSON-Patch ops
+    is_base = Column(Boolean, nullable=False, default=False)
+    doc_json = Column(JSONDoc, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    plan = relationship("WeeklyPlan", back_populates="versions")
+
+
+class PlanArchive(Base):
+    """History of an old plan, moved out of weekly_plans / plan_versions (see plan_store.archive_plan_history)"""
+    __tablename__ = "plan_archive"
+    __table_args__ = (Index("ix_plan_archive_user_week", "user_id", "week_start_date"),)
+    
+    # weekly_plans.id of the plan
+    plan_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
+    week_start_date = Column(Date, nullable=False)
+    version = Column(Integer, nullable=False)
+    # True when the plan row itself was archived (a newer plan for the week exists)
+    superseded = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    # zlib-compressed JSON: {"plan_json": head or null, "versions": [plan_versions rows]}
+    doc_gz = Column(LargeBinary, nullable=False)
+
+
+class PlanDay(Base):
+    """One day of the current plan for a date; projection of plan_json, see plan_projection.py"""
+    __tablename__ = "plan_days"
+    __table_args__ = (Index("uq_plan_days_user_date", "user_id", "date", unique=True),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    plan_id = Column(Integer, ForeignKey("weekly_plans.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
+    date = Column(Date, nullable=False)
+    position = Column(Integer, nullable=False)
+    start = Column(String, nullable=True)
+    duration_min = Column(Integer, nullable=True)
+    location = Column(String, nullable=True)
+    intensity_note = Column(Text, nullable=True)
+    fallbacks_json = Column(JSONDoc, nullable=True)
+    sleep_target_hr = Column(Float, nullable=True)
+    mobility_min = Column(Integer, nullable=True)
+    hydration_l = Column(Float, nullable=True)
+
+
+class PlanMeal(Base):
+    __tablename__ = "plan_meals"
+    __table_args__ = (Index("ix_plan_meals_user_date", "user_id", "date"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    plan_day_id = Column(Integer, ForeignKey("plan_days.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
+    date = Column(Date, nullable=False)
+    position = Column(Integer, nullable=False)
+    time = Column(String, nullable=True)
+    name = Column(String, nullable=True)
+    macro_note = Column(Text, nullable=True)
+    ingredients_json = Column(JSONDoc, nullable=True)
+    recipe_steps_json = Column(JSONDoc, nullable=True)
+
+
+class PlanBlock(Base):
+    __tablename__ = "plan_blocks"
+    __table_args__ = (Index("ix_plan_blocks_user_date", "user_id", "date"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    plan_day_id = Column(Integer, ForeignKey("plan_days.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
+    date = Column(Date, nullable=False)
+    position = Column(Integer, nullable=False)
+    name = Column(String, nullable=True)
+    sets = Column(Integer, nullable=True)
+    reps = Column(String, nullable=True)
+    rest_sec = Column(Integer, nullable=True)
 
 
 class AdherenceLog(Base):
+    # On Postgres the table is range-partitioned by month on date with primary
+    # key (id, date) (migrations/0004, maintenance.py creates the partitions)
     __tablename__ = "adherence_logs"
+    __table_args__ = (Index("uq_adherence_logs_user_date", "user_id", "date", unique=True),)
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
@@ -113,11 +236,73 @@ class AdherenceLog(Base):
     soreness = Column(Integer, nullable=True)
     meals_done = Column(Integer, default=0)
     notes = Column(Text, nullable=True)
+    # RPE x workout minutes, recorded at save time (see training_load.py)
+    session_load = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     profile = relationship("Profile", back_populates="adherence_logs")
 
 
+class TrainingLoad(Base):
+    """Rolling EWMA training-load state, one row per user, see training_load.py"""
+    __tablename__ = "training_load"
+    
+    user_id = Column(String, ForeignKey("profiles.user_id"), primary_key=True)
+    acute_load = Column(Float, nullable=False, default=0.0)
+    chronic_load = Column(Float, nullable=False, default=0.0)
+    soreness_fast = Column(Float, nullable=True)
+    soreness_slow = Column(Float, nullable=True)
+    last_date = Column(Date, nullable=True)
+    last_load = Column(Float, nullable=False, default=0.0)
+    last_soreness = Column(Integer, nullable=True)
+    days_logged = Column(Integer, nullable=False, default=0)
+    # Bumped only when a save actually changes the state
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    profile = relationship("Profile", back_populates="training_load")
+
+
+class PantryLedger(Base):
+    """Running on-hand vs. still-planned quantity per pantry item, see pantry_ledger.py"""
+    __tablename__ = "pantry_ledger"
+    __table_args__ = (UniqueConstraint("user_id", "item_name", "unit", name="uq_pantry_ledger_item"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False, index=True)
+    item_name = Column(String, nullable=False)
+    unit = Column(String, nullable=False)
+    on_hand = Column(Float, nullable=False, default=0.0)
+    remaining_need = Column(Float, nullable=False, default=0.0)
+    short = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PantryConsumption(Base):
+    """Append-only consumption events; the audit trail behind PantryLedger"""
+    __tablename__ = "pantry_consumption"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False, index=True)
+    date = Column(Date, nullable=False)
+    item_name = Column(String, nullable=False)
+    unit = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MealSwapCache(Base):
+    """Shared (cross-user) store of LLM meal-swap suggestions, see swap_cache.py"""
+    __tablename__ = "meal_swap_cache"
+    
+    cache_key = Column(String, primary_key=True)
+    ingredient = Column(String, nullable=False)
+    pantry_fingerprint = Column(String, nullable=False)
+    meal_type = Column(String, nullable=False)
+    suggestion_json = Column(JSONDoc, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Reminder(Base):
     __tablename__ = "reminders"
     
@@ -125,55 +310,77 @@ class Reminder(Base):
     user_id = Column(String, ForeignKey("profiles.user_id"), nullable=False)
     channel = Column(String, nullable=False)
     cron_expr = Column(String, nullable=False)
-    payload_json = Column(JSON, nullable=False)
+    payload_json = Column(JSONDoc, nullable=False)
     active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     profile = relationship("Profile", back_populates="reminders")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        return db
-    finally:
-        pass
+USER_CONTEXT_SQL = text("SELECT set_config('app.current_user_id', :user_id, true)")
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _apply_user_context(session, transaction, connection):
+    """Scope the RLS user to each transaction a user session begins.
+
+    set_config(..., true) is the bound-parameter form of SET LOCAL: it ends
+    with the transaction, so a pooled connection (or a PgBouncer server
+    connection in transaction mode) never carries one user's id into the
+    next checkout.
+    """
+    user_id = session.info.get("user_id")
+    if user_id is not None and connection.dialect.name == "postgresql":
+        connection.execute(USER_CONTEXT_SQL, {"user_id": user_id})
 
 
 def get_user_db(user_id: str):
     """Get database session with user context for RLS"""
-    db = SessionLocal()
-    try:
-        # Set user context for RLS policies
-        db.execute(text(f"SET app.current_user_id = '{user_id}'"))
-        db.commit()
-        return db
-    except Exception as e:
-        db.close()
-        raise e
+    return SessionLocal(info={"user_id": user_id})
 
 
-def set_user_context(user_id: str):
-    """Set the current user context for RLS policies"""
-    db = SessionLocal()
+@contextmanager
+def session_scope(user_id: str = None):
+    """Session for a ``with`` block, closed on exit however the block ends.
+
+    With ``user_id`` it is a get_user_db() session. Uncommitted work is
+    rolled back by the close.
+    """
+    db = get_user_db(user_id) if user_id is not None else SessionLocal()
     try:
-        # Set the current user ID in the database session
-        db.execute(text(f"SET app.current_user_id = '{user_id}'"))
-        db.commit()
+        yield db
     finally:
         db.close()
 
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def init_db(force: bool = False):
+    """Bring the schema up to date, once per process.
+
+    Every page run calls this; after the first call it returns without
+    touching the database. The first call costs one query when the database
+    is already at the newest migration, otherwise create_all() plus the
+    pending migrations.
+    """
+    global _schema_ready
+    if _schema_ready and not force:
+        return
+    with _schema_lock:
+        if _schema_ready and not force:
+            return
+        if force or not is_current(engine):
+            Base.metadata.create_all(bind=engine)
+            # create_all does not change existing tables; see migrate.py / migrations/
+            upgrade(engine)
+        _schema_ready = True
 
 
 def get_or_create_profile(user_id: str, email: str, timezone: str = "UTC"):
-    db = SessionLocal()
+    db = get_user_db(user_id)
     try:
-        # Set user context for RLS
-        db.execute(text(f"SET app.current_user_id = '{user_id}'"))
-        
         profile = db.query(Profile).filter(Profile.user_id == user_id).first()
         if not profile:
             profile = Profile(user_id=user_id, email=email, timezone=timezone)
@@ -185,6 +392,37 @@ def get_or_create_profile(user_id: str, email: str, timezone: str = "UTC"):
         db.close()
 
 
+SETUP_STEPS = (
+    ("onboarding", Questionnaire),
+    ("equipment", Equipment),
+    ("pantry", Pantry),
+    ("schedule", Availability),
+    ("weekly_plan", WeeklyPlan),
+)
+
+
+def get_setup_status(user_id: str, email: str, timezone: str = "UTC"):
+    """Profile plus which setup steps are done, as (profile, {step: bool}), in one query.
+
+    Creates the profile on first login, like get_or_create_profile.
+    """
+    db = get_user_db(user_id)
+    try:
+        row = db.query(
+            Profile,
+            *[exists().where(model.user_id == Profile.user_id).label(step) for step, model in SETUP_STEPS]
+        ).filter(Profile.user_id == user_id).first()
+        if row is None:
+            profile = Profile(user_id=user_id, email=email, timezone=timezone)
+            db.add(profile)
+            db.commit()
+            db.refresh(profile)
+            return profile, {step: False for step, _ in SETUP_STEPS}
+        return row[0], {step: bool(done) for (step, _), done in zip(SETUP_STEPS, row[1:])}
+    finally:
+        db.close()
+
+
 def create_user(email: str, password: str, timezone: str = "UTC"):
     """Create a new user with email and password"""
     db = SessionLocal()
@@ -233,3 +471,109 @@ def get_user_by_id(user_id: str):
         return profile
     finally:
         db.close()
+
+
+def upsert(db, model, conflict_cols, values, update_cols=None):
+    """INSERT ``values`` or, if a row with the same ``conflict_cols`` exists, UPDATE it.
+
+    One INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement, so two
+    concurrent saves cannot both insert (no duplicate-key error) and the row
+    returned is the one this statement wrote. ``conflict_cols`` must match a
+    unique constraint or index. On conflict only ``update_cols`` are written
+    (default: every key in ``values`` outside ``conflict_cols``). Caller commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    values = dict(values)
+    if "updated_at" in model.__table__.c:
+        # onupdate does not fire for ON CONFLICT DO UPDATE
+        values.setdefault("updated_at", datetime.utcnow())
+    if update_cols is None:
+        update_cols = [key for key in values if key not in conflict_cols]
+    elif "updated_at" in values:
+        update_cols = [*update_cols, "updated_at"]
+
+    stmt = insert(model).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(conflict_cols),
+        set_={key: stmt.excluded[key] for key in update_cols}
+    ).returning(model)
+    return db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+
+def upsert_user_doc(db, model, user_id: str, update_cols=None, **values):
+    """Upsert the user's Questionnaire / Equipment / Pantry / Availability row (unique on user_id)"""
+    return upsert(db, model, ("user_id",), {"user_id": user_id, **values}, update_cols)
+
+
+def upsert_adherence_log(db, user_id: str, log_date, **values):
+    """Upsert the user's adherence log for ``log_date`` (unique on user_id, date)"""
+    return upsert(db, AdherenceLog, ("user_id", "date"), {"user_id": user_id, "date": log_date, **values})
+
+
+def json_contains(doc, pattern):
+    """Python equivalent of jsonb ``doc @> pattern`` (for non-Postgres dialects)."""
+    if isinstance(pattern, dict):
+        return isinstance(doc, dict) and all(
+            key in doc and json_contains(doc[key], value) for key, value in pattern.items()
+        )
+    if isinstance(pattern, (list, tuple)):
+        return isinstance(doc, (list, tuple)) and all(
+            any(json_contains(item, wanted) for item in doc) for wanted in pattern
+        )
+    return doc == pattern
+
+
+def _containing(db, query, column, pattern):
+    if db.get_bind().dialect.name == "postgresql":
+        # @> against a jsonb_path_ops GIN index
+        return query.filter(column.op("@>")(literal(pattern, JSONB))).all()
+    key = column.key
+    return [row for row in query.all() if json_contains(getattr(row, key), pattern)]
+
+
+def plans_with_ingredient(db, ingredient: str, user_id: str = None, week_start=None):
+    """Weekly plans with a meal listing ``ingredient`` (the exact ingredient string)"""
+    query = db.query(WeeklyPlan)
+    if user_id is not None:
+        query = query.filter(WeeklyPlan.user_id == user_id)
+    if week_start is not None:
+        query = query.filter(WeeklyPlan.week_start_date == week_start)
+    pattern = {"days": [{"meals": [{"ingredients": [ingredient]}]}]}
+    return _containing(db, query, WeeklyPlan.plan_json, pattern)
+
+
+def plans_with_meal(db, meal_name: str, user_id: str = None):
+    """Weekly plans that include a meal named ``meal_name``"""
+    query = db.query(WeeklyPlan)
+    if user_id is not None:
+        query = query.filter(WeeklyPlan.user_id == user_id)
+    return _containing(db, query, WeeklyPlan.plan_json, {"days": [{"meals": [{"name": meal_name}]}]})
+
+
+def pantries_with_item(db, item_name: str, user_id: str = None):
+    """Pantry rows holding an item named ``item_name`` (exact name)"""
+    query = db.query(Pantry)
+    if user_id is not None:
+        query = query.filter(Pantry.user_id == user_id)
+    return _containing(db, query, Pantry.items_json, {"items": [{"name": item_name}]})
+
+
+def pantry_item_names_present(db, user_id: str, names):
+    """The subset of ``names`` found in the user's pantry, checked in SQL on Postgres"""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return set()
+    if db.get_bind().dialect.name == "postgresql":
+        rows = db.execute(text("""
+            SELECT n.name
+              FROM unnest(CAST(:names AS text[])) AS n(name)
+              JOIN pantry p ON p.user_id = :user_id
+             WHERE p.items_json @> jsonb_build_object('items', jsonb_build_array(jsonb_build_object('name', n.name)))
+        """), {"names": names, "user_id": user_id})
+        return {row[0] for row in rows}
+    pantry = db.query(Pantry).filter(Pantry.user_id == user_id).first()
+    doc = pantry.items_json if pantry else {}
+    return {name for name in names if json_contains(doc, {"items": [{"name": name}]})}
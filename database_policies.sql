@@ -10,6 +10,14 @@ ALTER TABLE availability ENABLE ROW LEVEL SECURITY;
 ALTER TABLE weekly_plans ENABLE ROW LEVEL SECURITY;
 ALTER TABLE adherence_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reminders ENABLE ROW LEVEL SECURITY;
+ALTER TABLE plan_versions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE plan_archive ENABLE ROW LEVEL SECURITY;
+ALTER TABLE plan_days ENABLE ROW LEVEL SECURITY;
+ALTER TABLE plan_meals ENABLE ROW LEVEL SECURITY;
+ALTER TABLE plan_blocks ENABLE ROW LEVEL SECURITY;
+ALTER TABLE training_load ENABLE ROW LEVEL SECURITY;
+ALTER TABLE pantry_ledger ENABLE ROW LEVEL SECURITY;
+ALTER TABLE pantry_consumption ENABLE ROW LEVEL SECURITY;
 
 -- Drop existing policies if they exist (for clean re-runs)
 DROP POLICY IF EXISTS "Users can view own profile" ON profiles;
@@ -44,6 +52,46 @@ DROP POLICY IF EXISTS "Users can view own reminders" ON reminders;
 DROP POLICY IF EXISTS "Users can update own reminders" ON reminders;
 DROP POLICY IF EXISTS "Users can insert own reminders" ON reminders;
 
+DROP POLICY IF EXISTS "Users can view own plan_versions" ON plan_versions;
+DROP POLICY IF EXISTS "Users can update own plan_versions" ON plan_versions;
+DROP POLICY IF EXISTS "Users can insert own plan_versions" ON plan_versions;
+DROP POLICY IF EXISTS "Users can delete own plan_versions" ON plan_versions;
+
+DROP POLICY IF EXISTS "Users can view own plan_archive" ON plan_archive;
+DROP POLICY IF EXISTS "Users can update own plan_archive" ON plan_archive;
+DROP POLICY IF EXISTS "Users can insert own plan_archive" ON plan_archive;
+DROP POLICY IF EXISTS "Users can delete own plan_archive" ON plan_archive;
+
+DROP POLICY IF EXISTS "Users can view own plan_days" ON plan_days;
+DROP POLICY IF EXISTS "Users can update own plan_days" ON plan_days;
+DROP POLICY IF EXISTS "Users can insert own plan_days" ON plan_days;
+DROP POLICY IF EXISTS "Users can delete own plan_days" ON plan_days;
+
+DROP POLICY IF EXISTS "Users can view own plan_meals" ON plan_meals;
+DROP POLICY IF EXISTS "Users can update own plan_meals" ON plan_meals;
+DROP POLICY IF EXISTS "Users can insert own plan_meals" ON plan_meals;
+DROP POLICY IF EXISTS "Users can delete own plan_meals" ON plan_meals;
+
+DROP POLICY IF EXISTS "Users can view own plan_blocks" ON plan_blocks;
+DROP POLICY IF EXISTS "Users can update own plan_blocks" ON plan_blocks;
+DROP POLICY IF EXISTS "Users can insert own plan_blocks" ON plan_blocks;
+DROP POLICY IF EXISTS "Users can delete own plan_blocks" ON plan_blocks;
+
+DROP POLICY IF EXISTS "Users can view own training_load" ON training_load;
+DROP POLICY IF EXISTS "Users can update own training_load" ON training_load;
+DROP POLICY IF EXISTS "Users can insert own training_load" ON training_load;
+DROP POLICY IF EXISTS "Users can delete own training_load" ON training_load;
+
+DROP POLICY IF EXISTS "Users can view own pantry_ledger" ON pantry_ledger;
+DROP POLICY IF EXISTS "Users can update own pantry_ledger" ON pantry_ledger;
+DROP POLICY IF EXISTS "Users can insert own pantry_ledger" ON pantry_ledger;
+DROP POLICY IF EXISTS "Users can delete own pantry_ledger" ON pantry_ledger;
+
+DROP POLICY IF EXISTS "Users can view own pantry_consumption" ON pantry_consumption;
+DROP POLICY IF EXISTS "Users can update own pantry_consumption" ON pantry_consumption;
+DROP POLICY IF EXISTS "Users can insert own pantry_consumption" ON pantry_consumption;
+DROP POLICY IF EXISTS "Users can delete own pantry_consumption" ON pantry_consumption;
+
 -- PROFILES TABLE POLICIES
 CREATE POLICY "Users can view own profile" ON profiles
     FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
@@ -124,6 +172,115 @@ CREATE POLICY "Users can update own reminders" ON reminders
 CREATE POLICY "Users can insert own reminders" ON reminders
     FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
 
+-- Plan history, plan projection, training load and pantry ledger tables.
+-- Every one carries user_id, and the app deletes and rewrites their rows
+-- (plan_store, plan_projection, pantry_ledger), so they also get a DELETE
+-- policy. meal_swap_cache holds no user data and is shared by all users.
+
+-- PLAN_VERSIONS TABLE POLICIES
+CREATE POLICY "Users can view own plan_versions" ON plan_versions
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own plan_versions" ON plan_versions
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own plan_versions" ON plan_versions
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own plan_versions" ON plan_versions
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
+-- PLAN_ARCHIVE TABLE POLICIES
+CREATE POLICY "Users can view own plan_archive" ON plan_archive
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own plan_archive" ON plan_archive
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own plan_archive" ON plan_archive
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own plan_archive" ON plan_archive
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
+-- PLAN_DAYS TABLE POLICIES
+CREATE POLICY "Users can view own plan_days" ON plan_days
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own plan_days" ON plan_days
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own plan_days" ON plan_days
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own plan_days" ON plan_days
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
+-- PLAN_MEALS TABLE POLICIES
+CREATE POLICY "Users can view own plan_meals" ON plan_meals
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own plan_meals" ON plan_meals
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own plan_meals" ON plan_meals
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own plan_meals" ON plan_meals
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
+-- PLAN_BLOCKS TABLE POLICIES
+CREATE POLICY "Users can view own plan_blocks" ON plan_blocks
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own plan_blocks" ON plan_blocks
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own plan_blocks" ON plan_blocks
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own plan_blocks" ON plan_blocks
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
+-- TRAINING_LOAD TABLE POLICIES
+CREATE POLICY "Users can view own training_load" ON training_load
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own training_load" ON training_load
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own training_load" ON training_load
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own training_load" ON training_load
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
+-- PANTRY_LEDGER TABLE POLICIES
+CREATE POLICY "Users can view own pantry_ledger" ON pantry_ledger
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own pantry_ledger" ON pantry_ledger
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own pantry_ledger" ON pantry_ledger
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own pantry_ledger" ON pantry_ledger
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
+-- PANTRY_CONSUMPTION TABLE POLICIES
+CREATE POLICY "Users can view own pantry_consumption" ON pantry_consumption
+    FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can update own pantry_consumption" ON pantry_consumption
+    FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can insert own pantry_consumption" ON pantry_consumption
+    FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+
+CREATE POLICY "Users can delete own pantry_consumption" ON pantry_consumption
+    FOR DELETE USING (user_id = current_setting('app.current_user_id', true));
+
 -- Grant necessary permissions to authenticated users
 GRANT USAGE ON SCHEMA public TO authenticated;
 GRANT ALL ON ALL TABLES IN SCHEMA public TO authenticated;
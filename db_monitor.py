@@ -0,0 +1,95 @@
+"""Connection checkout tracking and leak warnings.
+
+track_connections(engine) listens to the pool's checkout / checkin events
+and remembers, for every connection currently checked out, when it was
+taken and from where (the innermost application frames of the call stack).
+A daemon thread logs a warning with that call site for any connection held
+longer than DB_LEAK_THRESHOLD_SECONDS, once per checkout (0 turns the
+tracking off). A session keeps its connection until commit / rollback /
+close, so this also catches sessions that were never closed.
+
+checked_out() returns the same data for ad-hoc inspection.
+"""
+import logging
+import os
+import threading
+import time
+import traceback
+
+from sqlalchemy import event
+
+LEAK_THRESHOLD_SECONDS = float(os.environ.get("DB_LEAK_THRESHOLD_SECONDS", "30"))
+# Application frames kept per checkout
+STACK_DEPTH = 6
+
+_SKIP_PATHS = (os.sep + "sqlalchemy" + os.sep, os.sep + "streamlit" + os.sep, __file__)
+
+_checked_out = {}
+_lock = threading.Lock()
+_watcher = None
+
+
+def _call_site():
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if not frame.filename.startswith("<") and not any(p in frame.filename for p in _SKIP_PATHS)
+    ]
+    return "".join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    with _lock:
+        _checked_out[id(connection_record)] = [time.monotonic(), _call_site(), False]
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    with _lock:
+        _checked_out.pop(id(connection_record), None)
+
+
+def checked_out():
+    """[(seconds held, call site)] for every connection currently checked out, oldest first."""
+    now = time.monotonic()
+    with _lock:
+        held = [(now - started, site) for started, site, _ in _checked_out.values()]
+    return sorted(held, key=lambda item: -item[0])
+
+
+def report_leaks(threshold=None):
+    """Log each connection held past ``threshold`` seconds (once per checkout). Returns the count."""
+    threshold = LEAK_THRESHOLD_SECONDS if threshold is None else threshold
+    now = time.monotonic()
+    leaks = []
+    with _lock:
+        for entry in _checked_out.values():
+            if not entry[2] and now - entry[0] > threshold:
+                entry[2] = True
+                leaks.append((now - entry[0], entry[1]))
+    for held, site in leaks:
+        logging.warning(f"Database connection held for {held:.0f}s (pool has {len(_checked_out)} "
+                        f"checked out); checked out at:\n{site}")
+    return len(leaks)
+
+
+def _watch(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            report_leaks()
+        except Exception as e:
+            logging.warning(f"Connection leak check failed: {e}")
+
+
+def track_connections(engine):
+    """Install the checkout / checkin listeners on ``engine`` and start the watcher thread."""
+    global _watcher
+    if LEAK_THRESHOLD_SECONDS <= 0:
+        return
+    event.listen(engine, "checkout", _on_checkout)
+    event.listen(engine, "checkin", _on_checkin)
+    if _watcher is None:
+        _watcher = threading.Thread(
+            target=_watch, args=(max(1.0, LEAK_THRESHOLD_SECONDS / 2),),
+            name="db-leak-watch", daemon=True
+        )
+        _watcher.start()
@@ -0,0 +1,124 @@
+"""Check that the hot-path queries are planned on their indexes.
+
+    python explain_hot_paths.py
+
+Runs EXPLAIN (FORMAT JSON) for each query the pages issue on every load
+and reports the index the planner picked. Sequential scans are disabled
+for the check (SET LOCAL enable_seqscan = off): on a small development
+database a seq scan is always cheapest, so this verifies that an index
+*can* serve the query, not the plan production will choose; a Seq Scan
+node left in the plan means no index could. Exits non-zero if any query
+plans a Seq Scan or misses its index. On a partitioned table (adherence_logs,
+migration 0004) the scans use the partitions' own indexes, which count as
+the expected index when they are attached to it. Postgres only.
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import text
+
+from database import engine
+
+HOT_PATHS = [
+    (
+        "current weekly plan",
+        "SELECT * FROM weekly_plans WHERE user_id = :user_id AND week_start_date = :week_start "
+        "ORDER BY created_at DESC LIMIT 1",
+        "ix_weekly_plans_user_week_created",
+    ),
+    (
+        "today's adherence log",
+        "SELECT * FROM adherence_logs WHERE user_id = :user_id AND date = :today",
+        "uq_adherence_logs_user_date",
+    ),
+    (
+        "adherence history",
+        "SELECT * FROM adherence_logs WHERE user_id = :user_id ORDER BY date DESC",
+        "uq_adherence_logs_user_date",
+    ),
+    (
+        "login by email",
+        "SELECT * FROM profiles WHERE email = :email",
+        "ix_profiles_email",
+    ),
+    (
+        "plans with ingredient",
+        "SELECT id FROM weekly_plans WHERE plan_json @> CAST(:plan_pattern AS jsonb)",
+        "ix_weekly_plans_plan_json_gin",
+    ),
+    (
+        "pantries with item",
+        "SELECT id FROM pantry WHERE items_json @> CAST(:pantry_pattern AS jsonb)",
+        "ix_pantry_items_json_gin",
+    ),
+]
+
+
+PARTITION_INDEXES_SQL = text("""
+SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+ WHERE i.inhparent = to_regclass(:name)
+""")
+
+
+def _scans(node):
+    """(index names, relations read by Seq Scan) in the plan tree under ``node``."""
+    indexes = {node["Index Name"]} if "Index Name" in node else set()
+    seq_scans = {node.get("Relation Name", "?")} if node["Node Type"] == "Seq Scan" else set()
+    for child in node.get("Plans", []):
+        child_indexes, child_seq_scans = _scans(child)
+        indexes |= child_indexes
+        seq_scans |= child_seq_scans
+    return indexes, seq_scans
+
+
+def explain(conn, sql, params):
+    """(index names, Seq Scan relations) of the plan for ``sql``."""
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return _scans(plan[0]["Plan"])
+
+
+def index_family(conn, name):
+    """``name`` plus the partition indexes attached to it."""
+    return {name, *conn.execute(PARTITION_INDEXES_SQL, {"name": name}).scalars()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot-path queries")
+    parser.add_argument("--user-id", default="explain_check_user")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("explain_hot_paths.py needs a PostgreSQL DATABASE_URL")
+
+    today = date.today()
+    params = {
+        "user_id": args.user_id, "week_start": today, "today": today, "email": "nobody@example.com",
+        "plan_pattern": json.dumps({"days": [{"meals": [{"ingredients": ["rice (150 g)"]}]}]}),
+        "pantry_pattern": json.dumps({"items": [{"name": "rice"}]}),
+    }
+    failed = 0
+    with engine.connect() as conn:
+        for label, sql, expected in HOT_PATHS:
+            used, seq_scans = explain(conn, sql, params)
+            if seq_scans:
+                status = "SEQ "
+            elif used & index_family(conn, expected):
+                status = "ok  "
+            else:
+                status = "MISS"
+            failed += status != "ok  "
+            detail = ", ".join(sorted(used)) or "no index"
+            if seq_scans:
+                detail += f"; seq scan on {', '.join(sorted(seq_scans))}"
+            print(f"{status} {label:24} {detail}")
+        conn.rollback()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
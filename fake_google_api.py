@@ -0,0 +1,340 @@
+"""Local stand-in for the Gemini and Cloud Vision REST APIs.
+
+Used for load testing and benchmarking without paying for (or waiting on)
+the real services. Point the app at it with:
+
+    GENAI_API_ENDPOINT=http://127.0.0.1:8765
+    VISION_API_URL=http://127.0.0.1:8765/v1/images:annotate
+
+Modes:
+    synthetic  - answer with generated, schema-valid plans/days/swaps (default)
+    record     - proxy to the real APIs and append responses to a cassette
+    replay     - serve responses from a cassette recorded earlier
+
+Run:
+    python fake_google_api.py --port 8765 --latency lognormal:6.5,0.4 \\
+        --rate-429 0.02 --rate-truncate 0.01 --rate-malformed 0.01
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENAI_UPSTREAM = "https://generativelanguage.googleapis.com"
+VISION_UPSTREAM = "https://vision.googleapis.com"
+
+
+def parse_latency(spec):
+    """Build a sampler (returning seconds) from a spec string.
+
+    Supported: ``none``, ``const:MS``, ``uniform:LO_MS,HI_MS`` and
+    ``lognormal:MU,SIGMA`` (parameters of ln(ms)).
+    """
+    if not spec or spec == "none":
+        return lambda: 0.0
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "const":
+        return lambda: values[0] / 1000.0
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000.0
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1]) / 1000.0
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def _prompt_text(body):
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                parts.append(part["text"])
+    return "\n".join(parts)
+
+
+def classify_prompt(prompt):
+    if "Missing ingredient:" in prompt:
+        return "swap"
+    if "Regenerate ONLY the" in prompt:
+        return "section"
+    if "Regenerate date" in prompt or "one day plan" in prompt:
+        return "day"
+    return "plan"
+
+
+def _synthetic_day(day_date):
+    return {
+        "date": day_date,
+        "workout": {
+            "start": "18:00",
+            "duration_min": 45,
+            "location": "home",
+            "blocks": [
+                {"name": "Push-ups", "sets": 3, "reps": "10-12", "rest_sec": 60},
+                {"name": "Bodyweight Squats", "sets": 3, "reps": "15", "rest_sec": 60},
+            ],
+            "intensity_note": "Moderate intensity",
+            "fallbacks": ["Brisk walk"],
+        },
+        "meals": [
+            {"time": "Breakfast", "name": "Oat bowl", "ingredients": ["oats (80 g)", "milk (250 ml)"],
+             "macro_note": "P20/C60/F10", "recipe_steps": ["Cook oats in milk."]},
+            {"time": "Lunch", "name": "Rice and eggs", "ingredients": ["rice (150 g)", "eggs (2)"],
+             "macro_note": "P25/C70/F15", "recipe_steps": ["Boil rice.", "Fry eggs."]},
+            {"time": "Dinner", "name": "Chicken and vegetables", "ingredients": ["chicken breast (200 g)", "broccoli (150 g)"],
+             "macro_note": "P45/C20/F12", "recipe_steps": ["Grill chicken.", "Steam broccoli."]},
+        ],
+        "recovery": {"sleep_target_hr": 8, "mobility_min": 10, "hydration_l": 2.5},
+    }
+
+
+def synthetic_response(prompt):
+    """Return model text for a prompt, shaped like the real model's output."""
+    kind = classify_prompt(prompt)
+    dates = re.findall(r"\d{4}-\d{2}-\d{2}", prompt)
+    if kind == "swap":
+        return json.dumps({"replacement": "rice", "notes": "Similar carbohydrate profile"})
+    if kind == "section":
+        section = "workout" if 'ONLY the "workout"' in prompt else "meals"
+        days = [{"date": d, section: _synthetic_day(d)[section]} for d in dict.fromkeys(dates)]
+        return json.dumps({"days": days})
+    if kind == "day":
+        day_date = dates[0] if dates else datetime.utcnow().strftime("%Y-%m-%d")
+        return json.dumps(_synthetic_day(day_date))
+    week_start = dates[-1] if dates else datetime.utcnow().strftime("%Y-%m-%d")
+    base = datetime.strptime(week_start, "%Y-%m-%d")
+    days = [_synthetic_day((base + timedelta(days=i)).strftime("%Y-%m-%d")) for i in range(7)]
+    return json.dumps({
+        "week_start": week_start,
+        "days": days,
+        "summary": {"grocery_gap": [], "total_training_min": 45 * 7, "notes": "Synthetic plan"},
+        "justification": "Synthetic plan from the local stand-in server.",
+    })
+
+
+def synthetic_vision(body):
+    features = {f.get("type") for req in body.get("requests", []) for f in req.get("features", [])}
+    if "TEXT_DETECTION" in features:
+        return {"responses": [{"fullTextAnnotation": {"text": "MILK 1L 1.99\nEGGS 12 3.49\nRICE 1KG 2.10"}}]}
+    return {"responses": [{
+        "localizedObjectAnnotations": [{"name": "Dumbbell"}, {"name": "Bench"}],
+        "labelAnnotations": [{"description": "Gym"}, {"description": "Weight training"}],
+    }]}
+
+
+def genai_envelope(text, finish_reason="STOP"):
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": finish_reason,
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": len(text) // 4},
+    }
+
+
+class Cassette:
+    """JSONL store of recorded responses keyed by request fingerprint."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.by_key = {}
+        self.by_kind = {}
+        self._cycles = {}
+        try:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        self._index(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def key(route, payload_text):
+        return hashlib.sha256(f"{route}\n{payload_text}".encode("utf-8")).hexdigest()
+
+    def _index(self, entry):
+        self.by_key[entry["key"]] = entry
+        self.by_kind.setdefault(entry["kind"], []).append(entry)
+
+    def lookup(self, key, kind):
+        with self.lock:
+            if key in self.by_key:
+                return self.by_key[key]
+            # Fall back to cycling through recordings of the same kind so a
+            # small cassette can drive a long load test.
+            entries = self.by_kind.get(kind)
+            if not entries:
+                return None
+            if kind not in self._cycles:
+                self._cycles[kind] = itertools.cycle(entries)
+            return next(self._cycles[kind])
+
+    def record(self, key, kind, status, body):
+        entry = {"key": key, "kind": kind, "status": status, "body": body}
+        with self.lock:
+            self._index(entry)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry) + "\n")
+
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Populated by make_server()
+    config = None
+    cassette = None
+
+    def log_message(self, format, *args):
+        logging.debug("fake_google_api: " + format, *args)
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            body = json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON body"}})
+            return
+
+        cfg = self.config
+        time.sleep(cfg["latency"]())
+
+        if random.random() < cfg["rate_429"]:
+            self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        path = self.path.split("?", 1)[0]
+        if path.endswith(":generateContent"):
+            self._handle_generate(path, body)
+        elif path.endswith("images:annotate"):
+            self._handle_vision(path, body)
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown route {path}"}})
+
+    def _handle_generate(self, path, body):
+        cfg = self.config
+        prompt = _prompt_text(body)
+        kind = classify_prompt(prompt)
+        key = Cassette.key(path, prompt)
+
+        if cfg["mode"] == "record":
+            status, payload = self._forward(GENAI_UPSTREAM, body)
+            self.cassette.record(key, kind, status, payload)
+            self._send_json(status, payload)
+            return
+        if cfg["mode"] == "replay":
+            entry = self.cassette.lookup(key, kind)
+            if entry is None:
+                self._send_json(404, {"error": {"code": 404, "message": f"No recording for {kind}"}})
+                return
+            if entry["status"] != 200:
+                self._send_json(entry["status"], entry["body"])
+                return
+            text = entry["body"]["candidates"][0]["content"]["parts"][0]["text"]
+        else:
+            text = synthetic_response(prompt)
+
+        finish_reason = "STOP"
+        roll = random.random()
+        if roll < cfg["rate_truncate"]:
+            text = text[: max(1, len(text) // 2)]
+            finish_reason = "MAX_TOKENS"
+        elif roll < cfg["rate_truncate"] + cfg["rate_malformed"]:
+            text = "Here is your plan:\n" + text.replace('":', '"', 1) + "\n```"
+        self._send_json(200, genai_envelope(text, finish_reason))
+
+    def _handle_vision(self, path, body):
+        cfg = self.config
+        key = Cassette.key(path, json.dumps(body.get("requests", []), sort_keys=True)[:4096])
+
+        if cfg["mode"] == "record":
+            status, payload = self._forward(VISION_UPSTREAM, body)
+            self.cassette.record(key, "vision", status, payload)
+            self._send_json(status, payload)
+            return
+        if cfg["mode"] == "replay":
+            entry = self.cassette.lookup(key, "vision")
+            if entry is None:
+                self._send_json(404, {"error": {"code": 404, "message": "No recording for vision"}})
+                return
+            self._send_json(entry["status"], entry["body"])
+            return
+        self._send_json(200, synthetic_vision(body))
+
+    def _forward(self, upstream, body):
+        import requests
+
+        headers = {"Content-Type": "application/json"}
+        api_key = self.headers.get("x-goog-api-key")
+        if api_key:
+            headers["x-goog-api-key"] = api_key
+        resp = requests.post(upstream + self.path, headers=headers, json=body, timeout=300)
+        try:
+            payload = resp.json()
+        except ValueError:
+            payload = {"error": {"code": resp.status_code, "message": resp.text[:2000]}}
+        return resp.status_code, payload
+
+
+def make_server(host="127.0.0.1", port=8765, mode="synthetic", cassette_path="fake_google_api.jsonl",
+                latency="none", rate_429=0.0, rate_truncate=0.0, rate_malformed=0.0, seed=None):
+    """Create (but do not start) a ThreadingHTTPServer for the stand-in API."""
+    if seed is not None:
+        random.seed(seed)
+    config = {
+        "mode": mode,
+        "latency": parse_latency(latency),
+        "rate_429": rate_429,
+        "rate_truncate": rate_truncate,
+        "rate_malformed": rate_malformed,
+    }
+    cassette = Cassette(cassette_path) if mode in ("record", "replay") else None
+    handler = type("ConfiguredFakeGoogleHandler", (FakeGoogleHandler,), {"config": config, "cassette": cassette})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini/Vision stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=["synthetic", "record", "replay"], default="synthetic")
+    parser.add_argument("--cassette", default="fake_google_api.jsonl")
+    parser.add_argument("--latency", default="none", help="none | const:MS | uniform:LO,HI | lognormal:MU,SIGMA")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-truncate", type=float, default=0.0)
+    parser.add_argument("--rate-malformed", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.mode, args.cassette, args.latency,
+                         args.rate_429, args.rate_truncate, args.rate_malformed, args.seed)
+    logging.info(f"Fake Google API ({args.mode}) listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,117 @@
+"""Immutable plan documents with structural sharing.
+
+freeze() turns a WEEKLY_PLAN_V1 dict into FrozenDict / tuple nodes. Updates
+(assoc_in, with_day_patch, patch_days) return a new root that shares
+every untouched node with the old one: patching one day's workout copies
+the root, the days tuple, that day and nothing else. Old versions stay
+valid, so many can be kept in memory at a cost proportional to what
+changed, and nothing needs a defensive deep copy.
+
+FrozenDict is a dict subclass and tuples serialize as JSON arrays, so a
+frozen plan json.dumps() to the same document. Use thaw() where plain
+mutable lists are required (jsonschema validation, plan_store.make_patch).
+"""
+
+
+class FrozenDict(dict):
+    """A dict that refuses in-place mutation."""
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("FrozenDict is immutable; use assoc()/assoc_in()")
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+    __ior__ = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __repr__(self):
+        return f"FrozenDict({dict.__repr__(self)})"
+
+    def assoc(self, key, value):
+        """Return a copy with ``key`` set to ``value`` (shares all other values)."""
+        items = dict(self)
+        items[key] = value
+        return FrozenDict(items)
+
+
+def freeze(node):
+    """Deep-convert JSON data to FrozenDict / tuple nodes. Frozen input is returned as is."""
+    if isinstance(node, FrozenDict):
+        return node
+    if isinstance(node, dict):
+        return FrozenDict({key: freeze(value) for key, value in node.items()})
+    if isinstance(node, (list, tuple)):
+        return tuple(freeze(value) for value in node)
+    return node
+
+
+def thaw(node):
+    """Deep-convert a frozen tree back to plain dicts and lists."""
+    if isinstance(node, dict):
+        return {key: thaw(value) for key, value in node.items()}
+    if isinstance(node, tuple):
+        return [thaw(value) for value in node]
+    return node
+
+
+def assoc_in(node, path, value):
+    """Return ``node`` with the value at ``path`` (keys / indexes) replaced.
+
+    Only the containers along ``path`` are copied. Missing dict keys along
+    the way are created as empty FrozenDicts.
+    """
+    if not path:
+        return freeze(value)
+    key, rest = path[0], path[1:]
+    if isinstance(node, tuple):
+        return node[:key] + (assoc_in(node[key], rest, value),) + node[key + 1:]
+    node = node if node is not None else FrozenDict()
+    return node.assoc(key, assoc_in(node.get(key), rest, value))
+
+
+def day_index(plan):
+    """{date: position in plan["days"]}."""
+    return {day.get("date"): i for i, day in enumerate(plan.get("days", ()))}
+
+
+def with_day_patch(plan, date, patch, index=None):
+    """Return ``plan`` with the sections in ``patch`` replaced on ``date``."""
+    plan = freeze(plan)
+    index = day_index(plan) if index is None else index
+    i = index.get(date)
+    if i is None:
+        return plan
+    for section, value in patch.items():
+        plan = assoc_in(plan, ("days", i, section), value)
+    return plan
+
+
+def patch_days(plan, days_patch):
+    """Apply adapt_plan / regenerate_section style ``days_patch`` entries.
+
+    Dated entries replace day sections; a dateless ``summary_update`` adds
+    its grocery_gap items to the summary (without duplicates).
+    """
+    plan = freeze(plan)
+    index = day_index(plan)
+    for entry in days_patch:
+        patch = entry.get("patch", {})
+        if entry.get("date") is not None:
+            plan = with_day_patch(plan, entry["date"], patch, index)
+            continue
+        s_upd = patch.get("summary_update") or {}
+        if s_upd.get("grocery_gap"):
+            gap = (plan.get("summary") or FrozenDict()).get("grocery_gap", ())
+            gap = gap + tuple(it for it in dict.fromkeys(s_upd["grocery_gap"]) if it not in gap)
+            plan = assoc_in(plan, ("summary", "grocery_gap"), gap)
+    return plan
@@ -0,0 +1,155 @@
+"""Head-noun matching of plan ingredients against pantry items.
+
+Plan ingredients look like "chicken breast (200 g)" or "2 cups cooked rice",
+pantry items like "Chicken Breast" or "Rice". Names are normalized into
+token tuples (quantities, units, stop words and plurals removed); the last
+token is the head noun, the food the name is about.
+
+Two names match when their heads are equal, one token set contains the
+other, and none of the extra tokens is a DISTINCT_MODIFIERS word: "olive
+oil" matches a pantry "oil" and "rice" matches "basmati rice", but "oil"
+does not match "boiled eggs", "chicken" does not match "chicken stock",
+"rice" does not match "rice cakes" and "butter" does not match "peanut
+butter".
+
+The pantry is indexed once: every admissible token subset of each item
+maps to it, so a lookup is a handful of dict probes (the subsets of the
+ingredient's few tokens) whatever the pantry size.
+"""
+import re
+from functools import lru_cache
+from itertools import combinations
+
+STOP_WORDS = {
+    "a", "an", "and", "of", "the", "or", "to", "for", "with", "in",
+    "fresh", "frozen", "chopped", "diced", "sliced", "minced", "grated", "shredded",
+    "cooked", "raw", "boiled", "steamed", "roasted", "grilled", "baked", "dried",
+    "large", "medium", "small", "whole", "organic", "plain", "unsalted", "salted",
+    "boneless", "skinless", "lean", "low", "fat", "free", "canned", "optional",
+    "cup", "cups", "tbsp", "tsp", "tablespoon", "tablespoons", "teaspoon", "teaspoons",
+    "g", "gram", "grams", "kg", "mg", "ml", "l", "liter", "liters", "litre", "litres",
+    "oz", "ounce", "ounces", "lb", "lbs", "pound", "pounds", "piece", "pieces",
+    "slice", "slices", "pinch", "handful", "clove", "cloves", "can", "cans", "pack",
+    "scoop", "scoops", "serving", "servings", "unit", "units", "x",
+}
+
+# Modifiers that make a different food out of the head noun: "peanut
+# butter" is not butter, "coconut milk" is not milk
+DISTINCT_MODIFIERS = {
+    "peanut", "almond", "cashew", "hazelnut", "nut", "seed", "sunflower", "sesame",
+    "soy", "oat", "rice", "coconut", "apple",
+}
+
+# Names longer than this only index their full token set
+MAX_SUBSET_TOKENS = 6
+
+# Words the plural rules below would mangle
+_INVARIANT = {"hummus", "couscous", "asparagus", "molasses", "swiss", "citrus"}
+
+_PAREN_RE = re.compile(r"\([^)]*\)")
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def singularize(word):
+    if word in _INVARIANT or len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=8192)
+def normalize_tokens(name):
+    """Return the significant tokens of an ingredient or pantry name."""
+    text = _PAREN_RE.sub(" ", str(name).lower())
+    tokens = []
+    for tok in _TOKEN_RE.findall(text):
+        if tok in STOP_WORDS:
+            continue
+        tok = singularize(tok)
+        if tok not in STOP_WORDS and tok not in tokens:
+            tokens.append(tok)
+    return tuple(tokens)
+
+
+def normalize_name(name):
+    return " ".join(normalize_tokens(name))
+
+
+def _subsets(tokens):
+    """Token subsets that still name the same food (head and distinct modifiers kept), largest first."""
+    head = tokens[-1]
+    if len(tokens) > MAX_SUBSET_TOKENS:
+        return [frozenset(tokens)]
+    optional = [tok for tok in tokens[:-1] if tok not in DISTINCT_MODIFIERS]
+    required = frozenset(tok for tok in tokens if tok == head or tok in DISTINCT_MODIFIERS)
+    return [
+        required.union(kept)
+        for size in range(len(optional), -1, -1)
+        for kept in combinations(optional, size)
+    ]
+
+
+class PantryIndex:
+    """Subset index over pantry items, built once per pantry."""
+
+    def __init__(self, pantry_items):
+        self.items = list(pantry_items)
+        # exact token set -> first item with that name
+        self._exact = {}
+        # token set -> first item whose name contains it (same head, only
+        # non-distinct extras), i.e. an item at least as specific as the lookup
+        self._covering = {}
+        for idx, item in enumerate(self.items):
+            name = item.get("name", "") if isinstance(item, dict) else str(item)
+            tokens = normalize_tokens(name)
+            if not tokens:
+                continue
+            self._exact.setdefault(frozenset(tokens), idx)
+            for subset in _subsets(tokens):
+                self._covering.setdefault(subset, idx)
+        self._memo = {}
+
+    def match(self, ingredient):
+        """Return the pantry item matching ``ingredient``, or None."""
+        tokens = normalize_tokens(ingredient)
+        if not tokens:
+            return None
+        key = frozenset(tokens)
+        if key in self._memo:
+            return self._memo[key]
+
+        # The same name, then a more specific pantry item, then the most
+        # specific pantry name the ingredient can be reduced to
+        idx = self._exact.get(key)
+        if idx is None:
+            idx = self._covering.get(key)
+        if idx is None:
+            for subset in _subsets(tokens)[1:]:
+                idx = self._exact.get(subset)
+                if idx is not None:
+                    break
+        best = None if idx is None else self.items[idx]
+
+        self._memo[key] = best
+        return best
+
+    def contains(self, ingredient):
+        return self.match(ingredient) is not None
+
+    def missing(self, ingredients):
+        """Ingredients with no pantry match, de-duplicated in input order."""
+        result = []
+        seen = set()
+        for ing in ingredients:
+            if isinstance(ing, str) and ing not in seen:
+                seen.add(ing)
+                if not self.contains(ing):
+                    result.append(ing)
+        return result
@@ -0,0 +1,128 @@
+"""Scheduled table maintenance: adherence_logs partitions and plan history retention.
+
+    python maintenance.py partitions [--ahead 3]
+    python maintenance.py archive [--weeks 8] [--dry-run]
+    python maintenance.py all
+
+Run it daily (cron or any scheduler).
+
+partitions: adherence_logs is range-partitioned by month (migration 0004).
+Creates the partitions for this month through ``--ahead`` months out, plus
+any month whose rows fell into the default partition because its partition
+did not exist yet (those rows are moved into it). Postgres only.
+
+archive: moves plan history of weeks that started more than ``--weeks``
+weeks ago into the compressed plan_archive table. Superseded plans (an
+older plan row for a week that has a newer one) move entirely; current
+plans keep their head in weekly_plans and move only their plan_versions
+rows. plan_store.load_plan_version still reads archived versions.
+
+Like adaptation_sweep.py it reads every user's rows, so run it with a
+database role that is not restricted by the RLS policies.
+"""
+import argparse
+import logging
+import os
+from datetime import date, timedelta
+
+from sqlalchemy import exists, or_, text
+from sqlalchemy.orm import aliased
+
+from database import engine, init_db, SessionLocal, WeeklyPlan, PlanVersion
+from plan_store import archive_plan_history
+
+PARTITION_MONTHS_AHEAD = int(os.environ.get("PARTITION_MONTHS_AHEAD", "3"))
+PLAN_RETENTION_WEEKS = int(os.environ.get("PLAN_RETENTION_WEEKS", "8"))
+ARCHIVE_BATCH = 200
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD, today=None):
+    """Create missing monthly adherence_logs partitions. Returns the months created."""
+    if engine.dialect.name != "postgresql":
+        return []
+    first = (today or date.today()).replace(day=1)
+    with engine.connect() as conn:
+        stray = {row[0] for row in conn.execute(text(
+            "SELECT DISTINCT date_trunc('month', date)::date FROM adherence_logs_default"
+        ))}
+
+    created = []
+    for month in sorted(stray | {_add_months(first, i) for i in range(months_ahead + 1)}):
+        # one transaction per month: creating a partition locks the default partition
+        with engine.begin() as conn:
+            if conn.execute(text("SELECT ensure_adherence_logs_partition(:month)"), {"month": month}).scalar():
+                created.append(month)
+                logging.info(f"Created partition adherence_logs_{month:%Y_%m}")
+    return created
+
+
+def archive_plans(weeks=PLAN_RETENTION_WEEKS, today=None, batch=ARCHIVE_BATCH, dry_run=False):
+    """Archive the history of plans for weeks older than ``weeks`` weeks.
+
+    Returns {"superseded": plans archived whole, "history": plans whose
+    versions were archived}.
+    """
+    cutoff = (today or date.today()) - timedelta(weeks=weeks)
+    newer = aliased(WeeklyPlan)
+    is_superseded = exists().where(
+        newer.user_id == WeeklyPlan.user_id,
+        newer.week_start_date == WeeklyPlan.week_start_date,
+        newer.created_at > WeeklyPlan.created_at
+    )
+    has_history = exists().where(PlanVersion.plan_id == WeeklyPlan.id)
+
+    counts = {"superseded": 0, "history": 0}
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.query(WeeklyPlan, is_superseded.label("superseded")).filter(
+                WeeklyPlan.week_start_date < cutoff,
+                WeeklyPlan.id > last_id,
+                or_(is_superseded, has_history)
+            ).order_by(WeeklyPlan.id).limit(batch).all()
+            if rows:
+                last_id = rows[-1][0].id
+            for plan, superseded in rows:
+                if not dry_run:
+                    archive_plan_history(db, plan, superseded=bool(superseded))
+                counts["superseded" if superseded else "history"] += 1
+            if not dry_run:
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if len(rows) < batch:
+            return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create adherence_logs partitions and archive old plan history")
+    parser.add_argument("command", choices=["partitions", "archive", "all"])
+    parser.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="Months of partitions to create ahead")
+    parser.add_argument("--weeks", type=int, default=PLAN_RETENTION_WEEKS, help="Keep plan history of the last N weeks")
+    parser.add_argument("--dry-run", action="store_true", help="Count the plans to archive without moving them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_db()
+
+    if args.command in ("partitions", "all"):
+        created = ensure_partitions(args.ahead)
+        print(f"partitions created : {', '.join(f'{m:%Y-%m}' for m in created) or 'none'}")
+    if args.command in ("archive", "all"):
+        counts = archive_plans(args.weeks, dry_run=args.dry_run)
+        suffix = " (dry run)" if args.dry_run else ""
+        print(f"superseded plans   : {counts['superseded']}{suffix}")
+        print(f"plan histories     : {counts['history']}{suffix}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Versioned schema migrations.
+
+    python migrate.py status
+    python migrate.py up [--to N]
+    python migrate.py down --to N
+
+Migrations live in migrations/ as NNNN_name.up.sql / NNNN_name.down.sql
+pairs. Applied versions are recorded in the schema_migrations table; each
+migration runs with its bookkeeping row in one transaction, so a failed
+script leaves the schema at the previous version. Scripts are written to
+be safe on a database that create_all() has already brought up to date
+(IF [NOT] EXISTS), because init_db() runs create_all() before upgrade().
+
+Concurrent app processes starting at once serialize on an advisory lock,
+so each migration is applied exactly once.
+
+init_db() skips create_all() and upgrade() entirely once is_current() says
+every migration is applied, so a model change (new table, column or index)
+must ship with a migration, even one whose script only uses IF NOT EXISTS,
+or it will not reach existing databases.
+"""
+import argparse
+import logging
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Arbitrary key for pg_advisory_lock, shared by every process running migrations
+MIGRATION_LOCK_KEY = 7318204
+
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.(up|down)\.sql$")
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+
+class Migration:
+    __slots__ = ("version", "name", "up_path", "down_path")
+
+    def __init__(self, version, name):
+        self.version = version
+        self.name = name
+        self.up_path = None
+        self.down_path = None
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Migrations found in ``directory``, ordered by version."""
+    found = {}
+    for filename in os.listdir(directory):
+        match = _FILE_RE.match(filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        migration = found.setdefault(version, Migration(version, name))
+        setattr(migration, f"{direction}_path", os.path.join(directory, filename))
+    for migration in found.values():
+        if migration.up_path is None:
+            raise ValueError(f"Migration {migration.version:04d}_{migration.name} has no up script")
+    return [found[v] for v in sorted(found)]
+
+
+def _statements(path):
+    """Split a script into statements on ``;`` at end of line, dropping comments.
+
+    Text between ``$$`` quotes (function bodies, DO blocks) is never split.
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = [line for line in f if not line.lstrip().startswith("--")]
+    statements, current = [], []
+    for i, part in enumerate("".join(lines).split("$$")):
+        if i % 2:
+            current.append(f"$${part}$$")
+            continue
+        pieces = re.split(r";\s*$", part, flags=re.M)
+        current.append(pieces[0])
+        for piece in pieces[1:]:
+            statements.append("".join(current))
+            current = [piece]
+    statements.append("".join(current))
+    return [s.strip() for s in statements if s.strip()]
+
+
+def _lock(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def _unlock(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def applied_versions(conn):
+    conn.execute(text(CREATE_TABLE_SQL))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _run(engine, step):
+    """Run ``step(conn, applied)`` holding the migration lock."""
+    with engine.connect() as conn:
+        _lock(conn)
+        conn.commit()
+        try:
+            applied = applied_versions(conn)
+            conn.commit()
+            return step(conn, applied)
+        finally:
+            conn.rollback()
+            _unlock(conn)
+            conn.commit()
+
+
+def upgrade(engine, target=None, migrations=None):
+    """Apply pending migrations up to ``target`` (default: all). Returns applied versions."""
+    migrations = discover() if migrations is None else migrations
+
+    def step(conn, applied):
+        done = []
+        for migration in migrations:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            for statement in _statements(migration.up_path):
+                conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": migration.version, "n": migration.name, "t": datetime.utcnow()}
+            )
+            conn.commit()
+            logging.info(f"Applied migration {migration.version:04d}_{migration.name}")
+            done.append(migration.version)
+        return done
+
+    return _run(engine, step)
+
+
+def downgrade(engine, target, migrations=None):
+    """Revert applied migrations newer than ``target``, newest first. Returns reverted versions."""
+    migrations = discover() if migrations is None else migrations
+
+    def step(conn, applied):
+        done = []
+        for migration in reversed(migrations):
+            if migration.version not in applied or migration.version <= target:
+                continue
+            if migration.down_path is None:
+                raise ValueError(f"Migration {migration.version:04d}_{migration.name} cannot be reverted")
+            for statement in _statements(migration.down_path):
+                conn.execute(text(statement))
+            conn.execute(text("DELETE FROM schema_migrations WHERE version = :v"), {"v": migration.version})
+            conn.commit()
+            logging.info(f"Reverted migration {migration.version:04d}_{migration.name}")
+            done.append(migration.version)
+        return done
+
+    return _run(engine, step)
+
+
+def is_current(engine, migrations=None):
+    """True if every known migration has been applied (one query, no lock).
+
+    A missing schema_migrations table means a database that was never
+    initialized, so False.
+    """
+    migrations = discover() if migrations is None else migrations
+    try:
+        with engine.connect() as conn:
+            applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+    except DBAPIError:
+        return False
+    return all(m.version in applied for m in migrations)
+
+
+def status(engine, migrations=None):
+    """[(version, name, applied)] for every known migration."""
+    migrations = discover() if migrations is None else migrations
+    applied = _run(engine, lambda conn, applied: applied)
+    return [(m.version, m.name, m.version in applied) for m in migrations]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or revert schema migrations")
+    parser.add_argument("command", choices=["status", "up", "down"])
+    parser.add_argument("--to", type=int, default=None, help="Target version (required for down)")
+    args = parser.parse_args()
+
+    from database import engine, Base
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "up":
+        Base.metadata.create_all(bind=engine)
+        applied = upgrade(engine, args.to)
+        print(f"applied: {', '.join(f'{v:04d}' for v in applied) or 'nothing to do'}")
+    elif args.command == "down":
+        if args.to is None:
+            parser.error("down requires --to N (0 reverts everything)")
+        reverted = downgrade(engine, args.to)
+        print(f"reverted: {', '.join(f'{v:04d}' for v in reverted) or 'nothing to do'}")
+    else:
+        for version, name, applied in status(engine):
+            print(f"{version:04d}  {'applied' if applied else 'pending'}  {name}")
+
+
+if __name__ == "__main__":
+    main()
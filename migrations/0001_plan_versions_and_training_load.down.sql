@@ -0,0 +1,4 @@
+ALTER TABLE training_load DROP COLUMN IF EXISTS version;
+ALTER TABLE adherence_logs DROP COLUMN IF EXISTS session_load;
+ALTER TABLE weekly_plans DROP COLUMN IF EXISTS updated_at;
+ALTER TABLE weekly_plans DROP COLUMN IF EXISTS version;
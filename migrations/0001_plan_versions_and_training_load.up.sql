@@ -0,0 +1,6 @@
+-- Columns added after the first release; create_all does not add columns
+-- to existing tables.
+ALTER TABLE weekly_plans ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE weekly_plans ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE adherence_logs ADD COLUMN IF NOT EXISTS session_load DOUBLE PRECISION;
+ALTER TABLE training_load ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,3 @@
+DROP INDEX IF EXISTS uq_adherence_logs_user_date;
+DROP INDEX IF EXISTS ix_profiles_email;
+DROP INDEX IF EXISTS ix_weekly_plans_user_week_created;
@@ -0,0 +1,18 @@
+-- Current plan for a week: WHERE user_id = ? AND week_start_date = ? ORDER BY created_at DESC
+CREATE INDEX IF NOT EXISTS ix_weekly_plans_user_week_created
+    ON weekly_plans (user_id, week_start_date, created_at);
+
+-- Login: WHERE email = ?
+CREATE INDEX IF NOT EXISTS ix_profiles_email ON profiles (email);
+
+-- One adherence log per user and day. Keep the newest row of any
+-- duplicates left by concurrent saves before enforcing it.
+DELETE FROM adherence_logs a
+ USING adherence_logs b
+ WHERE a.user_id = b.user_id
+   AND a.date = b.date
+   AND a.id < b.id;
+
+-- Also serves WHERE user_id = ? [AND date ...] ORDER BY date
+CREATE UNIQUE INDEX IF NOT EXISTS uq_adherence_logs_user_date
+    ON adherence_logs (user_id, date);
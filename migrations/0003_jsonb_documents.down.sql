@@ -0,0 +1,18 @@
+DROP INDEX IF EXISTS ix_pantry_items_json_gin;
+DROP INDEX IF EXISTS ix_weekly_plans_plan_json_gin;
+
+ALTER TABLE reminders ALTER COLUMN payload_json TYPE json USING payload_json::json;
+ALTER TABLE meal_swap_cache ALTER COLUMN suggestion_json TYPE json USING suggestion_json::json;
+ALTER TABLE plan_versions ALTER COLUMN doc_json TYPE json USING doc_json::json;
+ALTER TABLE weekly_plans ALTER COLUMN plan_json TYPE json USING plan_json::json;
+ALTER TABLE availability ALTER COLUMN free_blocks_json TYPE json USING free_blocks_json::json;
+ALTER TABLE pantry ALTER COLUMN items_json TYPE json USING items_json::json;
+ALTER TABLE equipment ALTER COLUMN items_json TYPE json USING items_json::json;
+ALTER TABLE questionnaire
+    ALTER COLUMN bio_json TYPE json USING bio_json::json,
+    ALTER COLUMN goals_json TYPE json USING goals_json::json,
+    ALTER COLUMN diet_json TYPE json USING diet_json::json,
+    ALTER COLUMN allergens_json TYPE json USING allergens_json::json,
+    ALTER COLUMN cuisine_json TYPE json USING cuisine_json::json,
+    ALTER COLUMN work_hours_json TYPE json USING work_hours_json::json,
+    ALTER COLUMN reminder_prefs_json TYPE json USING reminder_prefs_json::json;
@@ -0,0 +1,23 @@
+-- json -> jsonb: parsed once on write, indexable, supports @> containment.
+-- USING col::jsonb is a no-op conversion on columns that are already jsonb.
+ALTER TABLE questionnaire
+    ALTER COLUMN bio_json TYPE jsonb USING bio_json::jsonb,
+    ALTER COLUMN goals_json TYPE jsonb USING goals_json::jsonb,
+    ALTER COLUMN diet_json TYPE jsonb USING diet_json::jsonb,
+    ALTER COLUMN allergens_json TYPE jsonb USING allergens_json::jsonb,
+    ALTER COLUMN cuisine_json TYPE jsonb USING cuisine_json::jsonb,
+    ALTER COLUMN work_hours_json TYPE jsonb USING work_hours_json::jsonb,
+    ALTER COLUMN reminder_prefs_json TYPE jsonb USING reminder_prefs_json::jsonb;
+ALTER TABLE equipment ALTER COLUMN items_json TYPE jsonb USING items_json::jsonb;
+ALTER TABLE pantry ALTER COLUMN items_json TYPE jsonb USING items_json::jsonb;
+ALTER TABLE availability ALTER COLUMN free_blocks_json TYPE jsonb USING free_blocks_json::jsonb;
+ALTER TABLE weekly_plans ALTER COLUMN plan_json TYPE jsonb USING plan_json::jsonb;
+ALTER TABLE plan_versions ALTER COLUMN doc_json TYPE jsonb USING doc_json::jsonb;
+ALTER TABLE meal_swap_cache ALTER COLUMN suggestion_json TYPE jsonb USING suggestion_json::jsonb;
+ALTER TABLE reminders ALTER COLUMN payload_json TYPE jsonb USING payload_json::jsonb;
+
+-- Containment searches (database.plans_with_ingredient, pantries_with_item)
+CREATE INDEX IF NOT EXISTS ix_weekly_plans_plan_json_gin
+    ON weekly_plans USING GIN (plan_json jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS ix_pantry_items_json_gin
+    ON pantry USING GIN (items_json jsonb_path_ops);
@@ -0,0 +1,41 @@
+-- Back to a single adherence_logs table with primary key (id)
+ALTER TABLE adherence_logs RENAME TO adherence_logs_partitioned;
+ALTER TABLE adherence_logs_partitioned RENAME CONSTRAINT adherence_logs_pkey TO adherence_logs_partitioned_pkey;
+ALTER INDEX uq_adherence_logs_user_date RENAME TO uq_adherence_logs_partitioned_user_date;
+
+CREATE TABLE adherence_logs (
+    id INTEGER NOT NULL DEFAULT nextval('adherence_logs_id_seq') PRIMARY KEY,
+    user_id VARCHAR NOT NULL REFERENCES profiles (user_id),
+    date DATE NOT NULL,
+    workout_done BOOLEAN,
+    rpe INTEGER,
+    soreness INTEGER,
+    meals_done INTEGER,
+    notes TEXT,
+    session_load DOUBLE PRECISION,
+    created_at TIMESTAMP
+);
+CREATE UNIQUE INDEX uq_adherence_logs_user_date ON adherence_logs (user_id, date);
+ALTER SEQUENCE adherence_logs_id_seq OWNED BY adherence_logs.id;
+
+INSERT INTO adherence_logs (id, user_id, date, workout_done, rpe, soreness, meals_done, notes, session_load, created_at)
+SELECT id, user_id, date, workout_done, rpe, soreness, meals_done, notes, session_load, created_at
+  FROM adherence_logs_partitioned;
+
+DO $$
+BEGIN
+    IF (SELECT relrowsecurity FROM pg_class WHERE oid = 'adherence_logs_partitioned'::regclass) THEN
+        ALTER TABLE adherence_logs ENABLE ROW LEVEL SECURITY;
+        CREATE POLICY "Users can view own adherence_logs" ON adherence_logs
+            FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+        CREATE POLICY "Users can update own adherence_logs" ON adherence_logs
+            FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+        CREATE POLICY "Users can insert own adherence_logs" ON adherence_logs
+            FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+    END IF;
+END
+$$;
+
+-- Drops the partitions with it
+DROP TABLE adherence_logs_partitioned;
+DROP FUNCTION IF EXISTS ensure_adherence_logs_partition(DATE);
@@ -0,0 +1,83 @@
+-- Range-partition adherence_logs by month on date, so queries bounded by
+-- date (Today, the adaptation sweep, the progress window) only scan the
+-- partitions they need. Partitioned tables need the partition key in every
+-- unique constraint: the primary key becomes (id, date); the one-log-per-day
+-- index (user_id, date) already includes it.
+ALTER TABLE adherence_logs RENAME TO adherence_logs_unpartitioned;
+ALTER TABLE adherence_logs_unpartitioned RENAME CONSTRAINT adherence_logs_pkey TO adherence_logs_unpartitioned_pkey;
+ALTER INDEX uq_adherence_logs_user_date RENAME TO uq_adherence_logs_unpartitioned_user_date;
+
+CREATE TABLE adherence_logs (
+    id INTEGER NOT NULL DEFAULT nextval('adherence_logs_id_seq'),
+    user_id VARCHAR NOT NULL REFERENCES profiles (user_id),
+    date DATE NOT NULL,
+    workout_done BOOLEAN,
+    rpe INTEGER,
+    soreness INTEGER,
+    meals_done INTEGER,
+    notes TEXT,
+    session_load DOUBLE PRECISION,
+    created_at TIMESTAMP,
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+CREATE UNIQUE INDEX uq_adherence_logs_user_date ON adherence_logs (user_id, date);
+ALTER SEQUENCE adherence_logs_id_seq OWNED BY adherence_logs.id;
+
+-- Rows for months without a partition land here until maintenance.py
+-- creates the partition (which moves them over).
+CREATE TABLE adherence_logs_default PARTITION OF adherence_logs DEFAULT;
+
+-- Creates the partition for the month of month_start, moving that month's
+-- rows out of the default partition first. Returns false if it exists.
+CREATE OR REPLACE FUNCTION ensure_adherence_logs_partition(month_start DATE) RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+DECLARE
+    first_day DATE := date_trunc('month', month_start)::date;
+    next_month DATE := (date_trunc('month', month_start) + interval '1 month')::date;
+    part TEXT := 'adherence_logs_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE adherence_logs INCLUDING DEFAULTS)', part);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM adherence_logs_default WHERE date >= %L AND date < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        first_day, next_month, part
+    );
+    EXECUTE format(
+        'ALTER TABLE adherence_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part, first_day, next_month
+    );
+    RETURN true;
+END
+$$;
+
+-- Partitions for every month with data, through three months ahead
+SELECT ensure_adherence_logs_partition(month::date)
+  FROM generate_series(
+           date_trunc('month', COALESCE((SELECT min(date) FROM adherence_logs_unpartitioned), CURRENT_DATE)),
+           date_trunc('month', CURRENT_DATE) + interval '3 months',
+           interval '1 month'
+       ) AS month;
+
+INSERT INTO adherence_logs (id, user_id, date, workout_done, rpe, soreness, meals_done, notes, session_load, created_at)
+SELECT id, user_id, date, workout_done, rpe, soreness, meals_done, notes, session_load, created_at
+  FROM adherence_logs_unpartitioned;
+
+-- Keep row level security (database_policies.sql) if it was enabled
+DO $$
+BEGIN
+    IF (SELECT relrowsecurity FROM pg_class WHERE oid = 'adherence_logs_unpartitioned'::regclass) THEN
+        ALTER TABLE adherence_logs ENABLE ROW LEVEL SECURITY;
+        CREATE POLICY "Users can view own adherence_logs" ON adherence_logs
+            FOR SELECT USING (user_id = current_setting('app.current_user_id', true));
+        CREATE POLICY "Users can update own adherence_logs" ON adherence_logs
+            FOR UPDATE USING (user_id = current_setting('app.current_user_id', true));
+        CREATE POLICY "Users can insert own adherence_logs" ON adherence_logs
+            FOR INSERT WITH CHECK (user_id = current_setting('app.current_user_id', true));
+    END IF;
+END
+$$;
+
+DROP TABLE adherence_logs_unpartitioned;
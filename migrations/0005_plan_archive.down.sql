@@ -0,0 +1 @@
+DROP TABLE IF EXISTS plan_archive;
@@ -0,0 +1,17 @@
+-- Plan history moved out of weekly_plans / plan_versions by the retention
+-- job (maintenance.py archive, plan_store.archive_plan_history).
+CREATE TABLE IF NOT EXISTS plan_archive (
+    plan_id INTEGER PRIMARY KEY,
+    user_id VARCHAR NOT NULL REFERENCES profiles (user_id),
+    week_start_date DATE NOT NULL,
+    version INTEGER NOT NULL,
+    superseded BOOLEAN NOT NULL,
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP,
+    doc_gz BYTEA NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_plan_archive_user_week ON plan_archive (user_id, week_start_date);
+
+-- doc_gz is zlib-compressed already; store it out of line without a second
+-- TOAST compression pass
+ALTER TABLE plan_archive ALTER COLUMN doc_gz SET STORAGE EXTERNAL;
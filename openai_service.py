@@ -6,6 +6,8 @@ import jsonschema
 import requests
 import base64
 import logging
+from immutable_plan import patch_days
+from plan_model import parse_plan
 
 # Configure basic logging (optional enhancement for debugging)
 logging.basicConfig(level=logging.INFO)
@@ -15,13 +17,29 @@ GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set it to your Google AI API key.")
 
+# Optional overrides so the app can be pointed at a local stand-in (see fake_google_api.py)
+GENAI_API_ENDPOINT = os.environ.get("GENAI_API_ENDPOINT")
+VISION_API_URL = os.environ.get("VISION_API_URL", "https://vision.googleapis.com/v1/images:annotate")
+
+
+def configure_genai():
+    """Configure the genai client, honouring GENAI_API_ENDPOINT when set."""
+    if GENAI_API_ENDPOINT:
+        genai.configure(
+            api_key=GOOGLE_API_KEY,
+            transport="rest",
+            client_options={"api_endpoint": GENAI_API_ENDPOINT},
+        )
+    else:
+        genai.configure(api_key=GOOGLE_API_KEY)
+
 def analyze_grocery_receipt(image_bytes):
     """Analyze grocery receipt image using Google Cloud Vision API"""
     # Convert the image to base64
     base64_image = base64.b64encode(image_bytes).decode('utf-8')
     
     # Prepare the request
-    url = 'https://vision.googleapis.com/v1/images:annotate'
+    url = VISION_API_URL
     headers = {
         'x-goog-api-key': GOOGLE_API_KEY,
         'Content-Type': 'application/json'
@@ -77,7 +95,7 @@ def analyze_gym_equipment(image_bytes):
     base64_image = base64.b64encode(image_bytes).decode('utf-8')
     
     # Prepare the request for both object detection and label detection
-    url = 'https://vision.googleapis.com/v1/images:annotate'
+    url = VISION_API_URL
     headers = {
         'x-goog-api-key': GOOGLE_API_KEY,
         'Content-Type': 'application/json'
@@ -137,7 +155,7 @@ def setup_genai():
     2. Known stable models list fallback
     Returns (model, chosen_model_name)
     """
-    genai.configure(api_key=GOOGLE_API_KEY)
+    configure_genai()
 
     generation_config = {
         "temperature": 0.6,  # slightly lower for more deterministic JSON
@@ -584,6 +602,9 @@ IMPORTANT: Return ONLY the JSON object with the exact structure above. Do not wr
 
         # Transform & validate against extended schema for robustness
         transformed = transform_api_response(plan_json)
+        # Replace the model's guessed grocery gap with one computed from quantities
+        from quantities import grocery_gap_strings
+        transformed["summary"]["grocery_gap"] = grocery_gap_strings(transformed, pantry.get("items", []))
         try:
             jsonschema.validate(instance=transformed, schema=WEEKLY_PLAN_V1)
         except jsonschema.exceptions.ValidationError as e:
@@ -602,18 +623,37 @@ IMPORTANT: Return ONLY the JSON object with the exact structure above. Do not wr
             "model_attempt": os.environ.get("GEMINI_MODEL")
         }
 
-def adapt_plan(current_plan, adherence_logs=None, pantry_delta=None):
+# intensity_note of a workout adapt_plan has already reduced
+RECOVERY_NOTE = "Reduced intensity for recovery"
+
+
+def already_deloaded(plan_doc, today):
+    """True if every workout from ``today`` on already carries the recovery reduction."""
+    upcoming = [
+        day.get("workout") or {}
+        for day in plan_doc.get("days", [])
+        if day.get("date", "") >= str(today)
+    ]
+    return all(w.get("intensity_note") == RECOVERY_NOTE for w in upcoming if w)
+
+
+def adapt_plan(current_plan, adherence_logs=None, pantry_delta=None, load_reasons=None):
     """
     Lightweight local adaptation function for weekly plans.
     - current_plan: dict (the plan JSON produced by generate_weekly_plan)
     - adherence_logs: list of dicts with keys: date, workout_done, rpe, soreness, meals_done
+    - load_reasons: optional list of triggers from training_load.load_reasons();
+      when given it replaces the soreness/RPE counting over adherence_logs
     - pantry_delta: optional dict with pantry info, e.g. {"items": [...], "days_until_shopping": N}
 
+    Workouts already reduced (intensity_note == RECOVERY_NOTE) are left as
+    they are, so adapting an adapted plan again does not compound the cut.
+
     Returns dict with keys:
     - status: "ADAPTED" or "NO_CHANGE" or "ERROR"
     - reason: human-readable reason
     - days_patch: list of { "date": "YYYY-MM-DD", "patch": {...} } (partial updates)
-    - new_plan (optional): full updated plan (only included when convenient)
+    - new_plan (optional): full updated plan as an immutable_plan frozen tree
     """
     try:
         if adherence_logs is None:
@@ -656,51 +696,40 @@ def adapt_plan(current_plan, adherence_logs=None, pantry_delta=None):
             return new_block
 
         # If soreness or RPE flags: create patches for future days
-        if high_soreness_count >= 2 or high_rpe_count >= 2:
+        if load_reasons:
+            reason_parts.append("; ".join(load_reasons) + " — reducing upcoming training load.")
+        elif high_soreness_count >= 2 or high_rpe_count >= 2:
             reason_parts.append("High recent soreness/RPE detected — reducing upcoming training load.")
+        if load_reasons or high_soreness_count >= 2 or high_rpe_count >= 2:
             today = datetime.utcnow().date()
-            for day in current_plan.get("days", []):
-                # Patch only for days >= today
-                try:
-                    day_date = datetime.fromisoformat(day.get("date")).date()
-                except Exception:
-                    # if date parsing fails, skip
+            # Patch only for days >= today
+            for day in parse_plan(current_plan).days_from(today):
+                if day.workout and day.workout.intensity_note == RECOVERY_NOTE:
                     continue
-                if day_date >= today:
-                    patch = {}
-                    workout = day.get("workout", {})
-                    if workout:
-                        new_workout = dict(workout)
-                        # reduce total duration by ~25%
-                        if isinstance(new_workout.get("duration_min"), int):
-                            new_workout["duration_min"] = max(5, int(new_workout["duration_min"] * 0.75))
-                        # reduce blocks
-                        new_blocks = []
-                        for b in new_workout.get("blocks", []):
-                            new_blocks.append(reduce_workout_block(b))
-                        new_workout["blocks"] = new_blocks
-                        # add a recovery note/intensity change
-                        new_workout["intensity_note"] = "Reduced intensity for recovery"
-                        patch["workout"] = new_workout
-                    if patch:
-                        days_patch.append({
-                            "date": day.get("date"),
-                            "patch": patch
-                        })
+                patch = {}
+                new_workout = day.workout.to_dict() if day.workout else {}
+                if new_workout:
+                    # reduce total duration by ~25%
+                    if isinstance(day.workout.duration_min, int):
+                        new_workout["duration_min"] = max(5, int(day.workout.duration_min * 0.75))
+                    # reduce blocks
+                    new_workout["blocks"] = [reduce_workout_block(b.to_dict()) for b in day.workout.blocks or ()]
+                    # add a recovery note/intensity change
+                    new_workout["intensity_note"] = RECOVERY_NOTE
+                    patch["workout"] = new_workout
+                if patch:
+                    days_patch.append({
+                        "date": day.date,
+                        "patch": patch
+                    })
 
         # Pantry delta handling: try to detect missing ingredients and produce grocery_gap
         pantry_gaps = []
         if pantry_delta:
-            pantry_items = [item.get("name", "").lower() for item in pantry_delta.get("items", [])]
-            for day in current_plan.get("days", []):
-                for meal in day.get("meals", []):
-                    for ing in meal.get("ingredients", []):
-                        if isinstance(ing, str):
-                            ing_name = ing.lower()
-                            # simple containment check
-                            found = any(p in ing_name or ing_name in p for p in pantry_items)
-                            if not found and ing not in pantry_gaps:
-                                pantry_gaps.append(ing)
+            from quantities import grocery_gap_strings
+
+            # quantified shortfall against what is on hand, e.g. "rice (350 g)"
+            pantry_gaps = grocery_gap_strings(current_plan, pantry_delta.get("items", []))
             if pantry_gaps:
                 reason_parts.append("Pantry update indicates missing ingredients.")
                 # Build a simple patch that adds grocery_gap to summary
@@ -717,34 +746,9 @@ def adapt_plan(current_plan, adherence_logs=None, pantry_delta=None):
             return {"status": "NO_CHANGE", "reason": "No adaptation rules triggered", "days_patch": []}
 
         reason_text = " | ".join(reason_parts) if reason_parts else "Adaptation applied"
-        # Optionally build a full new_plan by applying patches (lightweight)
-        new_plan = dict(current_plan)
-        if any(p.get("date") for p in days_patch):
-            # apply only date-specific patches
-            for dpatch in days_patch:
-                d = dpatch.get("date")
-                if not d:
-                    continue
-                for day in new_plan.get("days", []):
-                    if day.get("date") == d:
-                        day_patch = dpatch.get("patch", {})
-                        # shallow-merge workout if present
-                        if "workout" in day_patch:
-                            day["workout"] = day_patch["workout"]
-                        # could merge other parts as needed
-
-        # If there was a summary update patch (grocery gaps), merge it
-        for dpatch in days_patch:
-            if dpatch.get("date") is None:
-                s_upd = dpatch.get("patch", {}).get("summary_update")
-                if s_upd:
-                    if "summary" not in new_plan:
-                        new_plan["summary"] = {}
-                    new_plan["summary"].setdefault("grocery_gap", [])
-                    # extend without duplicates
-                    for it in s_upd.get("grocery_gap", []):
-                        if it not in new_plan["summary"]["grocery_gap"]:
-                            new_plan["summary"]["grocery_gap"].append(it)
+        # Structural sharing: only the patched days (and summary) are copied,
+        # current_plan is left untouched
+        new_plan = patch_days(current_plan, days_patch)
 
         return {
             "status": "ADAPTED",
@@ -757,8 +761,14 @@ def adapt_plan(current_plan, adherence_logs=None, pantry_delta=None):
         return {"status": "ERROR", "reason": str(e), "days_patch": []}
 
 
-def regenerate_day(input_data, target_date, reason=""):
-    """Regenerate a single day using the same model selection + schema utilities."""
+def regenerate_day(input_data, target_date, reason="", current_plan=None, data_version=None):
+    """Regenerate a single day using the same model selection + schema utilities.
+
+    current_plan lets the prompt list the neighbouring days' workouts so they
+    are not repeated; data_version enables context memoization (plan_context).
+    """
+    from plan_context import build_day_context
+
     # Provide a concise system prompt; reuse constraints for one day
     system_prompt = f"""You are a fitness and nutrition planning expert. Generate one day plan JSON only.
 Constraints mirrored from weekly plan: valid JSON, fields: date, workout, meals, recovery.
@@ -766,12 +776,14 @@ Workout: start, duration_min, location, blocks[], intensity_note, fallbacks[].
 Each block: name, sets, reps, rest_sec.
 Meals: time, name, ingredients[], macro_note, optional recipe_steps[].
 Recovery: sleep_target_hr, mobility_min, hydration_l.
+Use only the listed equipment and pantry items, never the allergens, and do not repeat the neighbour_workouts.
 Return ONLY JSON for a single day, no markdown.
 """
 
-    user_prompt = f"Regenerate date {target_date} (reason: {reason}). Context: {json.dumps(input_data)[:1500]}"
-
     try:
+        context = build_day_context(input_data, target_date, current_plan=current_plan, data_version=data_version)
+        user_prompt = f"Regenerate date {target_date} (reason: {reason}). Context: {context}"
+
         model, model_name = setup_genai()
         composite = f"{system_prompt}\n\n{user_prompt}"
         response = model.generate_content(composite)
@@ -789,10 +801,104 @@ Return ONLY JSON for a single day, no markdown.
         wrapper = {"week_start": target_date, "days": [day_json], "summary": {"notes": "Temp"}, "justification": "Single day regen"}
         wrapper = transform_api_response(wrapper)
         try:
-            # Validate that the single day now conforms
-            jsonschema.validate(instance=wrapper, schema=WEEKLY_PLAN_V1)
+            # Validate that the single day now conforms (the weekly schema requires 7 days)
+            jsonschema.validate(instance=wrapper["days"][0], schema=WEEKLY_PLAN_V1["properties"]["days"]["items"])
         except jsonschema.exceptions.ValidationError as e:
             return {"status": "ERROR", "message": f"Day schema invalid: {e.message}", "model": model_name}
         return {"status": "OK", "day": wrapper["days"][0], "model": model_name}
     except Exception as e:
-        return {"status": "ERROR", "message": str(e)}
\ No newline at end of file
+        return {"status": "ERROR", "message": str(e)}
+
+PLAN_SECTIONS = ("meals", "workout")
+
+
+def merge_section_days(current_plan, section, section_by_date):
+    """Return current_plan (frozen) with ``section`` replaced on the given dates.
+
+    Only the touched day nodes are copied; every other day, and the other
+    section of the touched days, is shared with current_plan.
+    """
+    return patch_days(current_plan, [
+        {"date": d, "patch": {section: value}} for d, value in section_by_date.items()
+    ])
+
+
+def regenerate_section(input_data, current_plan, section, dates, reason="", data_version=None):
+    """Regenerate only the ``meals`` or ``workout`` section for ``dates``.
+
+    The model is asked for that section alone, so output tokens scale with
+    the section size rather than the full day. Returns dict with keys:
+    - status: "OK" or "ERROR"
+    - days_patch: list of { "date": "YYYY-MM-DD", "patch": {section: ...} }
+    - new_plan: current_plan with the patches merged
+    """
+    from plan_context import build_range_context
+
+    if section not in PLAN_SECTIONS:
+        return {"status": "ERROR", "message": f"Unknown section: {section}"}
+    dates = [str(d) for d in dates]
+    if not dates:
+        return {"status": "ERROR", "message": "No dates to regenerate"}
+
+    if section == "meals":
+        shape = "meals: [{time, name, ingredients[], macro_note, optional recipe_steps[]}]"
+    else:
+        shape = "workout: {start, duration_min, location, blocks[{name, sets, reps, rest_sec}], intensity_note, fallbacks[]}"
+
+    system_prompt = f"""You are a fitness and nutrition planning expert. Regenerate ONLY the "{section}" section for the listed dates.
+Return ONLY JSON of the form {{"days": [{{"date": "YYYY-MM-DD", {shape}}}]}} with one entry per listed date, no markdown.
+Use only the listed equipment and pantry items, never the allergens, and respect the diet type and injuries.
+"""
+
+    try:
+        context = build_range_context(input_data, dates, section, current_plan=current_plan, data_version=data_version)
+        user_prompt = f"Regenerate {section} (reason: {reason}). Context: {context}"
+
+        model, model_name = setup_genai()
+        response = model.generate_content(f"{system_prompt}\n\n{user_prompt}")
+        raw = getattr(response, "text", "") or ""
+        cleaned = clean_json_response(raw)
+        first = cleaned.find("{"); last = cleaned.rfind("}")
+        if first != -1 and last != -1:
+            cleaned = cleaned[first:last+1]
+        try:
+            section_json = json.loads(cleaned)
+        except json.JSONDecodeError as e:
+            return {"status": "ERROR", "message": f"Invalid JSON section: {e}", "raw": raw[:800], "model": model_name}
+
+        # Only days the model actually answered count: the normalizer fills
+        # in missing dates and gives a day without a workout a default rest
+        # day, which would hide an omitted date behind a made-up section
+        raw_keys = (section, "workouts") if section == "workout" else (section,)
+        answered = [
+            day for day in section_json.get("days", [])
+            if isinstance(day, dict) and day.get("date") in dates and any(key in day for key in raw_keys)
+        ]
+
+        # Reuse the plan normalizer, then keep only the requested section
+        wrapper = {"week_start": dates[0], "days": answered, "summary": {"notes": "Temp"}, "justification": "Section regen"}
+        wrapper = transform_api_response(wrapper)
+        section_schema = WEEKLY_PLAN_V1["properties"]["days"]["items"]["properties"][section]
+
+        section_by_date = {}
+        for day in wrapper["days"]:
+            if day.get("date") in dates and section in day:
+                try:
+                    jsonschema.validate(instance=day[section], schema=section_schema)
+                except jsonschema.exceptions.ValidationError as e:
+                    return {"status": "ERROR", "message": f"Section schema invalid: {e.message}", "model": model_name}
+                section_by_date[day["date"]] = day[section]
+
+        missing = [d for d in dates if d not in section_by_date]
+        if missing:
+            return {"status": "ERROR", "message": f"Model omitted dates: {', '.join(missing)}", "model": model_name}
+
+        return {
+            "status": "OK",
+            "reason": reason or f"Regenerated {section}",
+            "days_patch": [{"date": d, "patch": {section: section_by_date[d]}} for d in dates],
+            "new_plan": merge_section_days(current_plan, section, section_by_date),
+            "model": model_name,
+        }
+    except Exception as e:
+        return {"status": "ERROR", "message": str(e)}
@@ -0,0 +1,183 @@
+"""Per-user pantry consumption ledger.
+
+Each ledger row tracks one pantry item (in grams or pieces): how much is on
+hand and how much the plan still needs before the next shopping date. When
+a meal is logged on the Today page only the rows for that meal's
+ingredients change, and ``short`` is kept up to date on every write, so
+"what runs out before next_shopping_date" is a filtered read of the flagged
+rows instead of a walk over the remaining plan.
+
+Every change is also written to ``pantry_consumption`` so rebuild_ledger()
+can recompute the whole ledger from the pantry, the plan and the event log
+(after a pantry save, a new plan, or for an audit).
+
+The saved pantry quantities are what the user had when they saved them, so
+only consumption recorded after the pantry row's updated_at is taken off
+on_hand; events of today or later still reduce the remaining need. Pantry
+items without a parseable quantity are matched but not tracked, i.e.
+counted as covered, as in quantities.grocery_gap.
+"""
+from datetime import date, timedelta
+
+from database import PantryLedger, PantryConsumption, Pantry, WeeklyPlan
+from ingredient_matcher import PantryIndex
+from quantities import DIMENSION_UNITS, pantry_name_index, pantry_supply, split_ingredient, to_grams, aggregate
+
+EPSILON = 1e-6
+
+
+def _is_short(on_hand, remaining_need):
+    return on_hand + EPSILON < remaining_need
+
+
+def _remaining_days(db, user_id, start, end):
+    """Plan days in [start, end) from the newest plan of each overlapping week."""
+    plans = db.query(WeeklyPlan).filter(
+        WeeklyPlan.user_id == user_id,
+        WeeklyPlan.week_start_date > start - timedelta(days=7),
+        WeeklyPlan.week_start_date < end
+    ).order_by(WeeklyPlan.created_at.desc()).all()
+
+    seen_weeks = set()
+    days = []
+    for plan in plans:
+        if plan.week_start_date in seen_weeks:
+            continue
+        seen_weeks.add(plan.week_start_date)
+        days.extend(
+            day for day in plan.plan_json.get("days", [])
+            if str(start) <= day.get("date", "") < str(end)
+        )
+    return days
+
+
+def _resolve(index, known_keys, name, dimension):
+    """Ledger key (item_name, dimension) for an ingredient, or None if untrackable."""
+    match = index.match(name)
+    if match is not None:
+        key = (match["name"], dimension)
+        # Same food measured in another dimension ("1 bag"); nothing to track
+        return key if key in known_keys else None
+    return (name, dimension)
+
+
+def rebuild_ledger(db, user_id, today=None):
+    """Recompute the user's ledger from scratch. Caller commits."""
+    today = today or date.today()
+    db.query(PantryLedger).filter(PantryLedger.user_id == user_id).delete(synchronize_session="fetch")
+
+    pantry = db.query(Pantry).filter(Pantry.user_id == user_id).first()
+    if not pantry:
+        return []
+
+    items = pantry.items_json.get("items", [])
+    supply = pantry_supply(items)
+    # Matches on an item missing from supply are untracked (covered), see _resolve
+    index = pantry_name_index(items)
+    next_shopping = pantry.next_shopping_date or (today + timedelta(days=7))
+
+    demand = aggregate(
+        split_ingredient(ing)
+        for day in _remaining_days(db, user_id, today, next_shopping)
+        for meal in day.get("meals", [])
+        for ing in meal.get("ingredients", [])
+        if isinstance(ing, str)
+    )
+
+    on_hand = dict(supply)
+    need = {}
+    for (name, dimension), amount in demand.items():
+        key = _resolve(index, supply, name, dimension)
+        if key is not None:
+            need[key] = need.get(key, 0.0) + amount
+            on_hand.setdefault(key, 0.0)
+
+    units = {unit: dim for dim, unit in DIMENSION_UNITS.items()}
+    since = pantry.last_shopping_date or today
+    events = db.query(PantryConsumption).filter(
+        PantryConsumption.user_id == user_id,
+        PantryConsumption.date >= since
+    ).all()
+    saved_at = pantry.updated_at
+    for event in events:
+        key = (event.item_name, units[event.unit])
+        after_save = saved_at is None or event.created_at is None or event.created_at > saved_at
+        if after_save and key in on_hand:
+            on_hand[key] -= event.amount
+        if event.date >= today and key in need:
+            need[key] = max(0.0, need[key] - event.amount)
+
+    rows = []
+    for (name, dimension), amount in on_hand.items():
+        remaining = need.get((name, dimension), 0.0)
+        rows.append(PantryLedger(
+            user_id=user_id,
+            item_name=name,
+            unit=DIMENSION_UNITS[dimension],
+            on_hand=amount,
+            remaining_need=remaining,
+            short=_is_short(amount, remaining)
+        ))
+    db.add_all(rows)
+    return rows
+
+
+def record_meals(db, user_id, log_date, meals, prev_done, new_done):
+    """Apply a change in meals_done to the ledger. Caller commits.
+
+    ``meals`` are the day's plan_model.Meal objects. Meals are taken in
+    plan order: going from 1 to 3 meals done consumes meals[1:3]; going
+    back down credits them again.
+    """
+    if new_done == prev_done:
+        return []
+    sign = 1.0 if new_done > prev_done else -1.0
+    lo, hi = sorted((prev_done, new_done))
+    changed_meals = meals[lo:hi]
+    if not changed_meals:
+        return []
+
+    rows = db.query(PantryLedger).filter(PantryLedger.user_id == user_id).all()
+    by_key = {(row.item_name, row.unit): row for row in rows}
+    index = PantryIndex([{"name": row.item_name} for row in rows])
+
+    touched = {}
+    for meal in changed_meals:
+        for ing in meal.ingredients or ():
+            name, amount, dimension = split_ingredient(ing)
+            grams, dimension = to_grams(name, amount, dimension)
+            if grams is None or not name:
+                continue
+            unit = DIMENSION_UNITS[dimension]
+            match = index.match(name)
+            item_name = match["name"] if match is not None and (match["name"], unit) in by_key else name
+
+            db.add(PantryConsumption(
+                user_id=user_id,
+                date=log_date,
+                item_name=item_name,
+                unit=unit,
+                amount=sign * grams
+            ))
+
+            row = by_key.get((item_name, unit))
+            if row is None:
+                continue
+            row.on_hand -= sign * grams
+            row.remaining_need = max(0.0, row.remaining_need - sign * grams)
+            row.short = _is_short(row.on_hand, row.remaining_need)
+            touched[(item_name, unit)] = row
+    return list(touched.values())
+
+
+def items_running_out(db, user_id):
+    """Ledger rows that will run out before the next shopping date."""
+    return db.query(PantryLedger).filter(
+        PantryLedger.user_id == user_id,
+        PantryLedger.short.is_(True)
+    ).order_by(PantryLedger.item_name).all()
+
+
+def format_shortfall(row):
+    short = row.remaining_need - max(row.on_hand, 0.0)
+    return f"{row.item_name} (short {round(short):g} {row.unit})"
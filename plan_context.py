@@ -0,0 +1,144 @@
+"""Compact, date-scoped prompt context for day and section regeneration.
+
+regenerate_day used to send ``json.dumps(input_data)[:1500]``, which cut
+off the pantry or allergens for most real users. build_day_context picks
+only the fields that matter for the target date and serializes them
+compactly. The user-level part is serialized once per (user, data version)
+and reused across calls.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+PANTRY_CONTEXT_LIMIT = int(os.environ.get("PANTRY_CONTEXT_LIMIT", "80"))
+CONTEXT_CACHE_SIZE = 256
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+_base_cache = OrderedDict()
+_base_lock = threading.Lock()
+
+
+def _compact(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def user_data_version(*rows):
+    """Version token for a user's setup rows (max of their ``updated_at``)."""
+    stamps = [str(getattr(row, "updated_at", "") or "") for row in rows if row is not None]
+    return "|".join(stamps)
+
+
+def _allowed_location(gym_frequency, weekday):
+    if gym_frequency == "daily":
+        return "gym or home"
+    if gym_frequency == "weekends_only" and weekday in ("Saturday", "Sunday"):
+        return "gym or home"
+    return "home"
+
+
+def _base_context(input_data):
+    questionnaire = input_data.get("questionnaire", {})
+    allergens = [a.lower() for a in questionnaire.get("allergens_json", []) or []]
+
+    pantry = []
+    for item in input_data.get("pantry", {}).get("items", []):
+        name = item.get("name", "")
+        if not name or any(a in name.lower() for a in allergens):
+            continue
+        qty = item.get("qty_unit")
+        pantry.append(f"{name} ({qty})" if qty else name)
+        if len(pantry) >= PANTRY_CONTEXT_LIMIT:
+            break
+
+    blocks_by_day = {}
+    for block in input_data.get("availability", {}).get("free_blocks", []):
+        blocks_by_day.setdefault(block.get("day"), []).append(f"{block.get('start')}-{block.get('end')}")
+
+    base = {
+        "equipment": input_data.get("equipment", {}).get("items", []),
+        "allergens": questionnaire.get("allergens_json", []) or [],
+        "diet": (questionnaire.get("diet_json") or {}).get("type"),
+        "injuries": (questionnaire.get("bio_json") or {}).get("injuries", []),
+        "goals": questionnaire.get("goals_json", {}),
+        "work_hours": questionnaire.get("work_hours_json", {}),
+        "pantry": pantry,
+    }
+    return {
+        "fragment": _compact(base)[1:-1],
+        "blocks_by_day": blocks_by_day,
+        "gym_frequency": questionnaire.get("gym_frequency", "never"),
+    }
+
+
+def _cached_base(input_data, data_version):
+    if data_version is None:
+        return _base_context(input_data)
+    key = (input_data.get("user", {}).get("id"), data_version)
+    with _base_lock:
+        if key in _base_cache:
+            _base_cache.move_to_end(key)
+            return _base_cache[key]
+    base = _base_context(input_data)
+    with _base_lock:
+        _base_cache[key] = base
+        while len(_base_cache) > CONTEXT_CACHE_SIZE:
+            _base_cache.popitem(last=False)
+    return base
+
+
+def _neighbour_workouts(current_plan, target):
+    if not current_plan:
+        return {}
+    wanted = {str(target - timedelta(days=1)), str(target + timedelta(days=1))}
+    result = {}
+    for day in current_plan.get("days", []):
+        if day.get("date") in wanted:
+            blocks = (day.get("workout") or {}).get("blocks", [])
+            result[day["date"]] = [b.get("name") for b in blocks]
+    return result
+
+
+def build_day_context(input_data, target_date, current_plan=None, data_version=None):
+    """Return the compact JSON context for regenerating ``target_date``.
+
+    data_version: token that changes whenever the user's setup rows change
+    (see user_data_version). When given, the user-level slice is memoized.
+    """
+    target = date.fromisoformat(str(target_date))
+    weekday = WEEKDAYS[target.weekday()]
+    base = _cached_base(input_data, data_version)
+
+    day_part = {
+        "date": str(target),
+        "weekday": weekday,
+        "free_blocks": base["blocks_by_day"].get(weekday, []),
+        "location": _allowed_location(base["gym_frequency"], weekday),
+        "neighbour_workouts": _neighbour_workouts(current_plan, target),
+    }
+    return "{" + _compact(day_part)[1:-1] + "," + base["fragment"] + "}"
+
+
+def build_range_context(input_data, dates, section, current_plan=None, data_version=None):
+    """Compact context for regenerating one section ("meals" or "workout") of several days."""
+    base = _cached_base(input_data, data_version)
+    plan_days = {d.get("date"): d for d in (current_plan or {}).get("days", [])}
+
+    day_parts = []
+    for target_date in dates:
+        target = date.fromisoformat(str(target_date))
+        weekday = WEEKDAYS[target.weekday()]
+        part = {"date": str(target), "weekday": weekday}
+        if section == "workout":
+            part["free_blocks"] = base["blocks_by_day"].get(weekday, [])
+            part["location"] = _allowed_location(base["gym_frequency"], weekday)
+            part["neighbour_workouts"] = _neighbour_workouts(current_plan, target)
+        else:
+            # Meals only need to know how hard the (unchanged) workout is
+            workout = (plan_days.get(str(target)) or {}).get("workout") or {}
+            part["training_min"] = workout.get("duration_min", 0)
+        day_parts.append(part)
+
+    return "{" + _compact({"section": section, "days": day_parts})[1:-1] + "," + base["fragment"] + "}"
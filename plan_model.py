@@ -0,0 +1,222 @@
+"""Typed, slot-based view of a WEEKLY_PLAN_V1 document.
+
+Plans are stored and exchanged as JSON dicts, and every consumer used to
+walk them with ``.get(key, default)`` chains. parse_plan() turns a plan
+into Plan / Day / Workout / Block / Meal / Recovery objects in a single
+pass; attributes are plain slots, and Plan keeps a date index so the
+day for a given date is a dict lookup.
+
+No coercion happens here: transform_api_response normalizes raw model
+output once before validation, so stored plans already have the schema
+types. Keys a class does not model are kept in ``extra`` and a field that
+was absent from the JSON is None, so ``to_dict()`` reproduces any
+schema-valid document exactly (schema fields never hold null).
+"""
+import threading
+from collections import OrderedDict
+
+from immutable_plan import thaw
+
+PARSED_PLAN_CACHE_SIZE = 256
+
+_parsed = OrderedDict()
+_parsed_lock = threading.Lock()
+
+
+def _extra(d, known):
+    if d.keys() <= known:
+        return None
+    return {k: v for k, v in d.items() if k not in known}
+
+
+def _out(pairs, extra):
+    d = {k: v for k, v in pairs if v is not None}
+    if extra:
+        d.update(thaw(extra))
+    return d
+
+
+class Block:
+    __slots__ = ("name", "sets", "reps", "rest_sec", "extra")
+    KEYS = frozenset(__slots__[:-1])
+
+    @classmethod
+    def from_json(cls, d):
+        b = cls.__new__(cls)
+        b.name = d.get("name")
+        b.sets = d.get("sets")
+        b.reps = d.get("reps")
+        b.rest_sec = d.get("rest_sec")
+        b.extra = _extra(d, cls.KEYS)
+        return b
+
+    def to_dict(self):
+        return _out((("name", self.name), ("sets", self.sets), ("reps", self.reps),
+                     ("rest_sec", self.rest_sec)), self.extra)
+
+
+class Workout:
+    __slots__ = ("start", "duration_min", "location", "blocks", "intensity_note", "fallbacks", "extra")
+    KEYS = frozenset(__slots__[:-1])
+
+    @classmethod
+    def from_json(cls, d):
+        w = cls.__new__(cls)
+        w.start = d.get("start")
+        w.duration_min = d.get("duration_min")
+        w.location = d.get("location")
+        blocks = d.get("blocks")
+        w.blocks = None if blocks is None else tuple(Block.from_json(b) for b in blocks)
+        w.intensity_note = d.get("intensity_note")
+        fallbacks = d.get("fallbacks")
+        w.fallbacks = None if fallbacks is None else tuple(fallbacks)
+        w.extra = _extra(d, cls.KEYS)
+        return w
+
+    def to_dict(self):
+        return _out((
+            ("start", self.start),
+            ("duration_min", self.duration_min),
+            ("location", self.location),
+            ("blocks", None if self.blocks is None else [b.to_dict() for b in self.blocks]),
+            ("intensity_note", self.intensity_note),
+            ("fallbacks", None if self.fallbacks is None else list(self.fallbacks)),
+        ), self.extra)
+
+
+class Meal:
+    __slots__ = ("time", "name", "ingredients", "macro_note", "recipe_steps", "extra")
+    KEYS = frozenset(__slots__[:-1])
+
+    @classmethod
+    def from_json(cls, d):
+        m = cls.__new__(cls)
+        m.time = d.get("time")
+        m.name = d.get("name")
+        ingredients = d.get("ingredients")
+        m.ingredients = None if ingredients is None else tuple(ingredients)
+        m.macro_note = d.get("macro_note")
+        steps = d.get("recipe_steps")
+        m.recipe_steps = None if steps is None else tuple(steps)
+        m.extra = _extra(d, cls.KEYS)
+        return m
+
+    def to_dict(self):
+        return _out((
+            ("time", self.time),
+            ("name", self.name),
+            ("ingredients", None if self.ingredients is None else list(self.ingredients)),
+            ("macro_note", self.macro_note),
+            ("recipe_steps", None if self.recipe_steps is None else list(self.recipe_steps)),
+        ), self.extra)
+
+
+class Recovery:
+    __slots__ = ("sleep_target_hr", "mobility_min", "hydration_l", "extra")
+    KEYS = frozenset(__slots__[:-1])
+
+    @classmethod
+    def from_json(cls, d):
+        r = cls.__new__(cls)
+        r.sleep_target_hr = d.get("sleep_target_hr")
+        r.mobility_min = d.get("mobility_min")
+        r.hydration_l = d.get("hydration_l")
+        r.extra = _extra(d, cls.KEYS)
+        return r
+
+    def to_dict(self):
+        return _out((("sleep_target_hr", self.sleep_target_hr), ("mobility_min", self.mobility_min),
+                     ("hydration_l", self.hydration_l)), self.extra)
+
+
+class Day:
+    __slots__ = ("date", "workout", "meals", "recovery", "extra")
+    KEYS = frozenset(__slots__[:-1])
+
+    @classmethod
+    def from_json(cls, d):
+        day = cls.__new__(cls)
+        day.date = d.get("date")
+        workout = d.get("workout")
+        day.workout = None if workout is None else Workout.from_json(workout)
+        meals = d.get("meals")
+        day.meals = None if meals is None else tuple(Meal.from_json(m) for m in meals)
+        recovery = d.get("recovery")
+        day.recovery = None if recovery is None else Recovery.from_json(recovery)
+        day.extra = _extra(d, cls.KEYS)
+        return day
+
+    def to_dict(self):
+        return _out((
+            ("date", self.date),
+            ("workout", None if self.workout is None else self.workout.to_dict()),
+            ("meals", None if self.meals is None else [m.to_dict() for m in self.meals]),
+            ("recovery", None if self.recovery is None else self.recovery.to_dict()),
+        ), self.extra)
+
+    def ingredients(self):
+        """Every ingredient string of the day's meals, in plan order."""
+        return [ing for meal in self.meals or () for ing in meal.ingredients or ()]
+
+
+class Plan:
+    __slots__ = ("week_start", "days", "summary", "justification", "extra", "_by_date")
+    KEYS = frozenset(("week_start", "days", "summary", "justification"))
+
+    @classmethod
+    def from_json(cls, d):
+        p = cls.__new__(cls)
+        p.week_start = d.get("week_start")
+        days = d.get("days")
+        p.days = None if days is None else tuple(Day.from_json(day) for day in days)
+        # summary is free-form (grocery_gap, totals, notes); kept as given
+        p.summary = d.get("summary")
+        p.justification = d.get("justification")
+        p.extra = _extra(d, cls.KEYS)
+        p._by_date = {day.date: day for day in p.days or ()}
+        return p
+
+    def to_dict(self):
+        return _out((
+            ("week_start", self.week_start),
+            ("days", None if self.days is None else [day.to_dict() for day in self.days]),
+            ("summary", thaw(self.summary)),
+            ("justification", self.justification),
+        ), self.extra)
+
+    def day(self, on):
+        """The Day for a date (``date`` or "YYYY-MM-DD"), or None."""
+        return self._by_date.get(str(on))
+
+    def days_from(self, on):
+        """Days dated on or after ``on``, in plan order."""
+        start = str(on)
+        return [day for day in self.days or () if (day.date or "") >= start]
+
+    @property
+    def grocery_gap(self):
+        return (self.summary or {}).get("grocery_gap") or []
+
+
+def parse_plan(doc):
+    """Parse a WEEKLY_PLAN_V1 dict (plain or immutable_plan frozen) into a Plan."""
+    return Plan.from_json(doc)
+
+
+def plan_for_row(plan_row):
+    """Parsed Plan for a WeeklyPlan row, reused until the row's version changes.
+
+    The Plan is shared between callers and must be treated as read-only;
+    changes go through days_patch / immutable_plan.
+    """
+    key = (plan_row.id, plan_row.version)
+    with _parsed_lock:
+        if key in _parsed:
+            _parsed.move_to_end(key)
+            return _parsed[key]
+    plan = parse_plan(plan_row.plan_json)
+    with _parsed_lock:
+        _parsed[key] = plan
+        while len(_parsed) > PARSED_PLAN_CACHE_SIZE:
+            _parsed.popitem(last=False)
+    return plan
@@ -0,0 +1,175 @@
+"""Row projection of the current plans: plan_days, plan_meals, plan_blocks.
+
+plan_json stays the source of truth; these tables copy it out one row per
+day, meal and exercise block, indexed by (user_id, date), so the Today
+page and the pantry checks read only the rows for the dates they show
+instead of loading and walking a week's document.
+
+plan_store keeps the projection in sync: save_plan re-projects the whole
+plan and apply_days_patch re-projects only the patched dates. A date
+holds the rows of the plan that was written for it last, which is the
+newest plan for the week. Plans saved before the projection existed are
+projected the first time one of their dates is read (ensure_projected).
+"""
+from datetime import date as date_type, timedelta
+
+from database import PlanDay, PlanMeal, PlanBlock, WeeklyPlan
+from plan_model import Day, plan_for_row
+
+
+def _as_date(value):
+    try:
+        return date_type.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _delete_dates(db, user_id, dates):
+    for model in (PlanMeal, PlanBlock, PlanDay):
+        db.query(model).filter(
+            model.user_id == user_id,
+            model.date.in_(dates)
+        ).delete(synchronize_session=False)
+
+
+def sync_plan(db, plan_row, dates=None):
+    """Write the projection rows for ``plan_row`` (all its days, or only ``dates``).
+
+    Caller commits.
+    """
+    plan = plan_for_row(plan_row)
+    wanted = None if dates is None else {str(d) for d in dates}
+    days = [
+        (on, i, day)
+        for i, day in enumerate(plan.days or ())
+        if (wanted is None or day.date in wanted) and (on := _as_date(day.date)) is not None
+    ]
+
+    if dates is None:
+        # the plan may have moved off dates it used to cover
+        stale = [d for (d,) in db.query(PlanDay.date).filter(PlanDay.plan_id == plan_row.id)]
+        _delete_dates(db, plan_row.user_id, set(stale) | {on for on, _, _ in days})
+    else:
+        _delete_dates(db, plan_row.user_id, [on for on, _, _ in days])
+    if not days:
+        return
+
+    rows = []
+    for on, position, day in days:
+        workout, recovery = day.workout, day.recovery
+        rows.append(PlanDay(
+            plan_id=plan_row.id,
+            user_id=plan_row.user_id,
+            date=on,
+            position=position,
+            start=workout and workout.start,
+            duration_min=workout and workout.duration_min,
+            location=workout and workout.location,
+            intensity_note=workout and workout.intensity_note,
+            fallbacks_json=list(workout.fallbacks) if workout and workout.fallbacks is not None else None,
+            sleep_target_hr=recovery and recovery.sleep_target_hr,
+            mobility_min=recovery and recovery.mobility_min,
+            hydration_l=recovery and recovery.hydration_l,
+        ))
+    db.add_all(rows)
+    db.flush()
+
+    children = []
+    for row, (on, _, day) in zip(rows, days):
+        for i, meal in enumerate(day.meals or ()):
+            children.append(PlanMeal(
+                plan_day_id=row.id, user_id=row.user_id, date=on, position=i,
+                time=meal.time, name=meal.name, macro_note=meal.macro_note,
+                ingredients_json=None if meal.ingredients is None else list(meal.ingredients),
+                recipe_steps_json=None if meal.recipe_steps is None else list(meal.recipe_steps),
+            ))
+        for i, block in enumerate((day.workout.blocks or ()) if day.workout else ()):
+            children.append(PlanBlock(
+                plan_day_id=row.id, user_id=row.user_id, date=on, position=i,
+                name=block.name, sets=block.sets, reps=block.reps, rest_sec=block.rest_sec,
+            ))
+    db.add_all(children)
+    db.flush()
+
+
+def ensure_projected(db, user_id, on):
+    """Project the newest plan covering ``on`` if it has no projection rows yet.
+
+    Returns True when rows were written. Caller commits.
+    """
+    plan = db.query(WeeklyPlan).filter(
+        WeeklyPlan.user_id == user_id,
+        WeeklyPlan.week_start_date <= on,
+        WeeklyPlan.week_start_date > on - timedelta(days=7)
+    ).order_by(WeeklyPlan.created_at.desc()).first()
+    if plan is None:
+        return False
+    if db.query(PlanDay.id).filter(PlanDay.plan_id == plan.id).first() is not None:
+        return False
+    sync_plan(db, plan)
+    return True
+
+
+def _day_doc(day_row, blocks, meals):
+    workout = {
+        "start": day_row.start,
+        "duration_min": day_row.duration_min,
+        "location": day_row.location,
+        "blocks": [
+            {"name": b.name, "sets": b.sets, "reps": b.reps, "rest_sec": b.rest_sec}
+            for b in blocks
+        ],
+        "intensity_note": day_row.intensity_note,
+        "fallbacks": day_row.fallbacks_json,
+    }
+    recovery = {
+        "sleep_target_hr": day_row.sleep_target_hr,
+        "mobility_min": day_row.mobility_min,
+        "hydration_l": day_row.hydration_l,
+    }
+    return {
+        "date": day_row.date.isoformat(),
+        "workout": {k: v for k, v in workout.items() if v is not None},
+        "meals": [
+            {k: v for k, v in (("time", m.time), ("name", m.name), ("ingredients", m.ingredients_json),
+                               ("macro_note", m.macro_note), ("recipe_steps", m.recipe_steps_json))
+             if v is not None}
+            for m in meals
+        ],
+        "recovery": {k: v for k, v in recovery.items() if v is not None},
+    }
+
+
+def get_day(db, user_id, on):
+    """(plan_model.Day, plan_id) for ``on`` read from the projection, or (None, None).
+
+    Commits if it had to project an older plan first.
+    """
+    day_row = db.query(PlanDay).filter(PlanDay.user_id == user_id, PlanDay.date == on).first()
+    if day_row is None:
+        if not ensure_projected(db, user_id, on):
+            return None, None
+        db.commit()
+        day_row = db.query(PlanDay).filter(PlanDay.user_id == user_id, PlanDay.date == on).first()
+        if day_row is None:
+            return None, None
+
+    blocks = db.query(PlanBlock).filter(
+        PlanBlock.user_id == user_id, PlanBlock.date == on
+    ).order_by(PlanBlock.position).all()
+    meals = db.query(PlanMeal).filter(
+        PlanMeal.user_id == user_id, PlanMeal.date == on
+    ).order_by(PlanMeal.position).all()
+    return Day.from_json(_day_doc(day_row, blocks, meals)), day_row.plan_id
+
+
+def remaining_ingredients(db, user_id, start, end):
+    """Ingredient strings of the planned meals dated in [start, end), in plan order."""
+    if ensure_projected(db, user_id, start):
+        db.commit()
+    rows = db.query(PlanMeal.ingredients_json).filter(
+        PlanMeal.user_id == user_id,
+        PlanMeal.date >= start,
+        PlanMeal.date < end
+    ).order_by(PlanMeal.date, PlanMeal.position).all()
+    return [ingredient for (ingredients,) in rows for ingredient in ingredients or ()]
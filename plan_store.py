@@ -0,0 +1,350 @@
+"""Versioned storage for weekly plans.
+
+Each WeeklyPlan row holds the materialized head (``plan_json``) so reads of
+the latest plan stay a single-row lookup. History lives in ``plan_versions``
+as a base document followed by JSON-Patch style deltas (RFC 6902 subset:
+add / remove / replace). Every COMPACT_EVERY deltas a fresh base is written
+so reconstructing an old version never replays a long chain.
+
+Adaptations go through apply_days_patch, which updates only the patched
+paths of the head in SQL (jsonb_set) under an optimistic version check.
+
+History of old weeks is moved to ``plan_archive`` by archive_plan_history
+(run from maintenance.py); load_plan_version reads it from there.
+"""
+import copy
+import json
+import os
+import zlib
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import WeeklyPlan, PlanVersion, PlanArchive
+from immutable_plan import thaw
+from plan_projection import sync_plan
+
+COMPACT_EVERY = int(os.environ.get("PLAN_COMPACT_EVERY", "10"))
+
+
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(old, new, path=""):
+    """Return a list of patch ops that turns ``old`` into ``new``."""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": copy.deepcopy(value)})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list):
+        # Element-wise diff only when the shape is unchanged (e.g. 7 days);
+        # otherwise replacing the list is both simpler and usually smaller.
+        if len(old) != len(new):
+            return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+        ops = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            ops.extend(make_patch(a, b, f"{path}/{i}"))
+        return ops
+
+    if old != new:
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+    return []
+
+
+def _resolve(doc, tokens):
+    parent = doc
+    for tok in tokens[:-1]:
+        parent = parent[int(tok)] if isinstance(parent, list) else parent[tok]
+    return parent
+
+
+def apply_patch(doc, ops):
+    """Apply patch ops to a deep copy of ``doc`` and return the result."""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        path = op["path"]
+        if path == "":
+            if op["op"] == "remove":
+                raise ValueError("Cannot remove the document root")
+            doc = copy.deepcopy(op["value"])
+            continue
+
+        tokens = [_unescape(t) for t in path.split("/")[1:]]
+        parent = _resolve(doc, tokens)
+        last = tokens[-1]
+
+        if isinstance(parent, list):
+            idx = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(idx, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[idx]
+            elif op["op"] == "replace":
+                parent[idx] = copy.deepcopy(op["value"])
+            else:
+                raise ValueError(f"Unsupported patch op: {op['op']}")
+        else:
+            if op["op"] in ("add", "replace"):
+                parent[last] = copy.deepcopy(op["value"])
+            elif op["op"] == "remove":
+                del parent[last]
+            else:
+                raise ValueError(f"Unsupported patch op: {op['op']}")
+    return doc
+
+
+def get_head_plan(db, user_id, week_start):
+    """Return the current WeeklyPlan row for a user's week, or None."""
+    return db.query(WeeklyPlan).filter(
+        WeeklyPlan.user_id == user_id,
+        WeeklyPlan.week_start_date == week_start
+    ).order_by(WeeklyPlan.created_at.desc()).first()
+
+
+def _deltas_since_base(db, plan):
+    last_base = db.query(PlanVersion.version).filter(
+        PlanVersion.plan_id == plan.id,
+        PlanVersion.is_base.is_(True)
+    ).order_by(PlanVersion.version.desc()).first()
+    base_version = last_base[0] if last_base else 0
+    return db.query(PlanVersion).filter(
+        PlanVersion.plan_id == plan.id,
+        PlanVersion.version > base_version
+    ).count()
+
+
+def save_plan(db, user_id, week_start, plan_doc):
+    """Store ``plan_doc`` as the newest version of the user's plan for the week.
+
+    The first save writes a base version; later saves append only the delta
+    against the current head and update the head in place. Caller commits.
+    Returns the WeeklyPlan head row.
+    """
+    # Frozen plans (immutable_plan) are stored as plain JSON
+    plan_doc = thaw(plan_doc)
+    head = get_head_plan(db, user_id, week_start)
+
+    if head is None:
+        head = WeeklyPlan(user_id=user_id, week_start_date=week_start, plan_json=plan_doc, version=1)
+        db.add(head)
+        db.flush()
+        db.add(PlanVersion(plan_id=head.id, user_id=user_id, version=1, is_base=True, doc_json=plan_doc))
+        sync_plan(db, head)
+        return head
+
+    ops = make_patch(head.plan_json, plan_doc)
+    if not ops:
+        return head
+
+    head.version = (head.version or 1) + 1
+    head.plan_json = plan_doc
+    db.add(PlanVersion(plan_id=head.id, user_id=user_id, version=head.version, is_base=False, doc_json=ops))
+    db.flush()
+    sync_plan(db, head)
+
+    if _deltas_since_base(db, head) >= COMPACT_EVERY:
+        compact_plan(db, head)
+    return head
+
+
+def compact_plan(db, plan):
+    """Write the head document as a new base so replays start from here."""
+    db.query(PlanVersion).filter(
+        PlanVersion.plan_id == plan.id,
+        PlanVersion.version == plan.version
+    ).update({"is_base": True, "doc_json": plan.plan_json}, synchronize_session=False)
+
+
+def load_plan_version(db, plan, version=None):
+    """Reconstruct ``plan`` at ``version`` (defaults to the head)."""
+    if version is None or version == plan.version:
+        return plan.plan_json
+
+    base = db.query(PlanVersion).filter(
+        PlanVersion.plan_id == plan.id,
+        PlanVersion.is_base.is_(True),
+        PlanVersion.version <= version
+    ).order_by(PlanVersion.version.desc()).first()
+    if base is None:
+        return _load_archived_version(db, plan, version)
+
+    doc = base.doc_json
+    deltas = db.query(PlanVersion).filter(
+        PlanVersion.plan_id == plan.id,
+        PlanVersion.version > base.version,
+        PlanVersion.version <= version
+    ).order_by(PlanVersion.version).all()
+    for delta in deltas:
+        doc = apply_patch(doc, delta.doc_json)
+    return doc
+
+
+def _pack(doc):
+    return zlib.compress(json.dumps(doc, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def archived_plan(db, plan_id):
+    """The archived document of ``plan_id`` ({"plan_json", "versions"}), or None."""
+    row = db.get(PlanArchive, plan_id)
+    return _unpack(row.doc_gz) if row else None
+
+
+def _load_archived_version(db, plan, version):
+    archived = archived_plan(db, plan.id)
+    rows = archived["versions"] if archived else []
+    rows = [r for r in rows if r["version"] <= version] + [
+        {"version": v.version, "is_base": v.is_base, "doc_json": v.doc_json}
+        for v in db.query(PlanVersion).filter(
+            PlanVersion.plan_id == plan.id,
+            PlanVersion.version <= version
+        ).order_by(PlanVersion.version)
+    ]
+    bases = [i for i, r in enumerate(rows) if r["is_base"]]
+    if not bases:
+        # Plans saved before versioning only have their head
+        return None
+    doc = rows[bases[-1]]["doc_json"]
+    for row in rows[bases[-1] + 1:]:
+        doc = apply_patch(doc, row["doc_json"])
+    return doc
+
+
+def archive_plan_history(db, plan, superseded=False):
+    """Move ``plan``'s plan_versions rows into its compressed plan_archive row.
+
+    With ``superseded`` (a newer plan exists for the week) the plan row goes
+    too; its projection rows are removed with it (ON DELETE CASCADE). Running
+    it again for the same plan appends to the archived document. Caller commits.
+    """
+    versions = db.query(PlanVersion).filter(
+        PlanVersion.plan_id == plan.id
+    ).order_by(PlanVersion.version).all()
+    row = db.get(PlanArchive, plan.id)
+    doc = _unpack(row.doc_gz) if row else {"plan_json": None, "versions": []}
+    doc["versions"].extend(
+        {
+            "version": v.version,
+            "is_base": v.is_base,
+            "doc_json": v.doc_json,
+            "created_at": v.created_at.isoformat() if v.created_at else None,
+        }
+        for v in versions
+    )
+    if superseded:
+        doc["plan_json"] = plan.plan_json
+
+    if row is None:
+        row = PlanArchive(plan_id=plan.id, user_id=plan.user_id, week_start_date=plan.week_start_date,
+                          created_at=plan.created_at)
+        db.add(row)
+    row.version = plan.version or 1
+    row.superseded = superseded
+    row.archived_at = datetime.utcnow()
+    row.doc_gz = _pack(doc)
+
+    db.query(PlanVersion).filter(PlanVersion.plan_id == plan.id).delete(synchronize_session=False)
+    if superseded:
+        db.query(WeeklyPlan).filter(WeeklyPlan.id == plan.id).delete(synchronize_session=False)
+    db.flush()
+    return row
+
+
+def days_patch_to_ops(plan_doc, days_patch):
+    """Translate adapt_plan/regenerate_section ``days_patch`` entries into patch ops.
+
+    Day patches replace whole sections (``/days/<i>/<section>``); a dateless
+    ``summary_update`` merges into ``/summary/grocery_gap``.
+    """
+    day_index = {day.get("date"): i for i, day in enumerate(plan_doc.get("days", []))}
+    ops = []
+    for entry in days_patch:
+        patch = entry.get("patch", {})
+        if entry.get("date") is None:
+            s_upd = patch.get("summary_update") or {}
+            if "grocery_gap" in s_upd:
+                merged = list((plan_doc.get("summary") or {}).get("grocery_gap", []))
+                for it in s_upd["grocery_gap"]:
+                    if it not in merged:
+                        merged.append(it)
+                ops.append({"op": "replace", "path": "/summary/grocery_gap", "value": merged})
+            continue
+        idx = day_index.get(entry["date"])
+        if idx is None:
+            continue
+        for section, value in patch.items():
+            ops.append({"op": "replace", "path": f"/days/{idx}/{_escape(section)}", "value": value})
+    return ops
+
+
+def apply_days_patch(db, plan, days_patch, expected_version=None):
+    """Persist ``days_patch`` onto ``plan`` in place.
+
+    On Postgres the head is updated with nested jsonb_set calls, so only the
+    patched sections travel to the database. The UPDATE is guarded by
+    ``version = expected_version``; if another adaptation got there first
+    nothing is written and None is returned, otherwise the new version.
+    The delta is appended to plan_versions in the same transaction.
+    Caller commits (or rolls back on None).
+    """
+    expected_version = plan.version if expected_version is None else expected_version
+    ops = days_patch_to_ops(plan.plan_json, days_patch)
+    if not ops:
+        return expected_version
+
+    if db.get_bind().dialect.name == "postgresql":
+        expr = "plan_json"
+        params = {"id": plan.id, "expected": expected_version}
+        for i, op in enumerate(ops):
+            tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+            params[f"path{i}"] = tokens
+            params[f"val{i}"] = json.dumps(op["value"])
+            expr = f"jsonb_set({expr}, CAST(:path{i} AS text[]), CAST(:val{i} AS jsonb))"
+        row = db.execute(text(f"""
+            UPDATE weekly_plans
+               SET plan_json = {expr},
+                   version = version + 1,
+                   updated_at = now()
+             WHERE id = :id AND version = :expected
+         RETURNING version
+        """), params).first()
+    else:
+        row = db.execute(text("""
+            UPDATE weekly_plans
+               SET plan_json = :doc, version = version + 1
+             WHERE id = :id AND version = :expected
+         RETURNING version
+        """), {"id": plan.id, "expected": expected_version,
+               "doc": json.dumps(apply_patch(plan.plan_json, ops))}).first()
+
+    if row is None:
+        return None
+
+    new_version = row[0]
+    db.add(PlanVersion(plan_id=plan.id, user_id=plan.user_id, version=new_version, is_base=False, doc_json=ops))
+    db.flush()
+    db.refresh(plan)
+    sync_plan(db, plan, [entry["date"] for entry in days_patch if entry.get("date") is not None])
+    if _deltas_since_base(db, plan) >= COMPACT_EVERY:
+        compact_plan(db, plan)
+    return new_version
@@ -0,0 +1,262 @@
+"""Quantity parsing, unit conversion and week-level demand aggregation.
+
+Pantry items carry free-form ``qty_unit`` strings ("500g", "1L", "12 eggs")
+and meal ingredients embed quantities as text ("oats (80 g)", the format
+transform_api_response produces). This module parses both into numeric
+amounts in a base unit per dimension:
+
+    mass   -> grams
+    volume -> millilitres
+    count  -> pieces
+
+Volumes and counts are folded into grams where a density or per-piece
+weight is known, so "1 cup rice" and "rice (150 g)" add up. The week's
+demand is aggregated per ingredient in one vectorized numpy pass and
+compared against the pantry to produce a quantified grocery gap.
+"""
+import re
+from fractions import Fraction
+
+import numpy as np
+
+from ingredient_matcher import PantryIndex, normalize_name
+
+MASS, VOLUME, COUNT = 0, 1, 2
+DIMENSION_UNITS = {MASS: "g", VOLUME: "ml", COUNT: "pcs"}
+
+# unit -> (dimension, factor to base unit)
+UNITS = {
+    "mg": (MASS, 0.001), "g": (MASS, 1.0), "gr": (MASS, 1.0), "gram": (MASS, 1.0), "grams": (MASS, 1.0),
+    "kg": (MASS, 1000.0), "kgs": (MASS, 1000.0), "kilo": (MASS, 1000.0), "kilos": (MASS, 1000.0),
+    "oz": (MASS, 28.3495), "ounce": (MASS, 28.3495), "ounces": (MASS, 28.3495),
+    "lb": (MASS, 453.592), "lbs": (MASS, 453.592), "pound": (MASS, 453.592), "pounds": (MASS, 453.592),
+    "ml": (VOLUME, 1.0), "millilitre": (VOLUME, 1.0), "milliliter": (VOLUME, 1.0),
+    "cl": (VOLUME, 10.0), "dl": (VOLUME, 100.0),
+    "l": (VOLUME, 1000.0), "litre": (VOLUME, 1000.0), "liter": (VOLUME, 1000.0),
+    "litres": (VOLUME, 1000.0), "liters": (VOLUME, 1000.0),
+    "tsp": (VOLUME, 5.0), "teaspoon": (VOLUME, 5.0), "teaspoons": (VOLUME, 5.0),
+    "tbsp": (VOLUME, 15.0), "tablespoon": (VOLUME, 15.0), "tablespoons": (VOLUME, 15.0),
+    "cup": (VOLUME, 240.0), "cups": (VOLUME, 240.0),
+    "floz": (VOLUME, 29.5735), "pint": (VOLUME, 473.176), "pints": (VOLUME, 473.176),
+    "gallon": (VOLUME, 3785.41), "gallons": (VOLUME, 3785.41),
+    "pc": (COUNT, 1.0), "pcs": (COUNT, 1.0), "piece": (COUNT, 1.0), "pieces": (COUNT, 1.0),
+    "unit": (COUNT, 1.0), "units": (COUNT, 1.0), "x": (COUNT, 1.0),
+    "dozen": (COUNT, 12.0), "slice": (COUNT, 1.0), "slices": (COUNT, 1.0),
+    "clove": (COUNT, 1.0), "cloves": (COUNT, 1.0), "can": (COUNT, 1.0), "cans": (COUNT, 1.0),
+}
+
+# g per ml; used to fold volumes into mass. Keys are normalized names.
+DENSITY_G_PER_ML = {
+    "water": 1.0, "milk": 1.03, "yogurt": 1.03, "greek yogurt": 1.03,
+    "oil": 0.92, "olive oil": 0.92, "coconut oil": 0.92, "butter": 0.91,
+    "honey": 1.42, "peanut butter": 1.08, "rice": 0.77, "basmati rice": 0.77,
+    "oat": 0.41, "flour": 0.53, "sugar": 0.85, "lentil": 0.81, "quinoa": 0.72,
+    "pasta": 0.45, "bean": 0.75, "black bean": 0.75, "chickpea": 0.75,
+    "spinach": 0.13, "berry": 0.6, "blueberry": 0.6, "almond": 0.6, "nut": 0.6,
+}
+DEFAULT_DENSITY = 1.0
+
+# g per piece; used to fold counts into mass.
+PIECE_WEIGHT_G = {
+    "egg": 50.0, "banana": 120.0, "apple": 180.0, "orange": 140.0, "onion": 110.0,
+    "potato": 170.0, "sweet potato": 130.0, "tomato": 120.0, "garlic": 5.0,
+    "avocado": 150.0, "bell pepper": 150.0, "carrot": 60.0, "cucumber": 300.0,
+    "bread": 30.0, "tortilla": 45.0, "chicken breast": 200.0, "lemon": 60.0,
+}
+
+_QTY_RE = re.compile(
+    r"(?P<num>\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)\s*(?P<unit>[a-zA-Z]+\.?)?"
+)
+_PAREN_RE = re.compile(r"\(([^)]*)\)")
+
+
+def _to_number(text):
+    text = text.replace(",", ".").strip()
+    if " " in text:
+        whole, frac = text.split(None, 1)
+        return float(int(whole) + Fraction(frac))
+    if "/" in text:
+        return float(Fraction(text))
+    return float(text)
+
+
+def parse_quantity(text):
+    """Parse "500g", "1.5 L", "12 eggs", "1/2 cup" into (amount, dimension).
+
+    The amount is expressed in the dimension's base unit. Unknown or missing units are
+    read as a count ("12 eggs" -> 12 pieces). Returns (None, None) when no
+    number is present.
+    """
+    if not text:
+        return None, None
+    match = _QTY_RE.search(str(text))
+    if not match:
+        return None, None
+    amount = _to_number(match.group("num"))
+    unit = (match.group("unit") or "").lower().rstrip(".")
+    dimension, factor = UNITS.get(unit, (COUNT, 1.0))
+    return amount * factor, dimension
+
+
+def split_ingredient(ingredient):
+    """Split "oats (80 g)" / "80 g oats" into (normalized_name, amount, dimension)."""
+    text = str(ingredient)
+    paren = _PAREN_RE.search(text)
+    if paren:
+        amount, dimension = parse_quantity(paren.group(1))
+    else:
+        amount, dimension = parse_quantity(text)
+    return normalize_name(text), amount, dimension
+
+
+def _lookup(table, name):
+    if name in table:
+        return table[name]
+    # fall back to the last token ("basmati rice" -> "rice")
+    last = name.rsplit(" ", 1)[-1]
+    return table.get(last)
+
+
+def to_grams(name, amount, dimension):
+    """Fold an amount into grams when possible; returns (value, dimension)."""
+    if amount is None:
+        return None, None
+    if dimension == MASS:
+        return amount, MASS
+    if dimension == VOLUME:
+        return amount * (_lookup(DENSITY_G_PER_ML, name) or DEFAULT_DENSITY), MASS
+    piece = _lookup(PIECE_WEIGHT_G, name)
+    if piece:
+        return amount * piece, MASS
+    return amount, COUNT
+
+
+def _to_arrays(entries):
+    """entries: iterable of (name, amount, dimension) -> (names, key array, value array)."""
+    key_of = {}
+    names = []
+    keys = []
+    values = []
+    for name, amount, dimension in entries:
+        value, dim = to_grams(name, amount, dimension)
+        if value is None or not name:
+            continue
+        key = (name, dim)
+        if key not in key_of:
+            key_of[key] = len(names)
+            names.append(key)
+        keys.append(key_of[key])
+        values.append(value)
+    return names, np.asarray(keys, dtype=np.int64), np.asarray(values, dtype=np.float64)
+
+
+def aggregate(entries):
+    """Sum amounts per (name, dimension) in one vectorized pass.
+
+    Returns {(name, dimension): total}.
+    """
+    names, keys, values = _to_arrays(entries)
+    if not names:
+        return {}
+    totals = np.bincount(keys, weights=values, minlength=len(names))
+    return {name: float(total) for name, total in zip(names, totals)}
+
+
+def week_demand(plan, from_date=None):
+    """Total demand per ingredient across the plan's days (on/after ``from_date``)."""
+    start = str(from_date) if from_date else ""
+    return aggregate(
+        split_ingredient(ing)
+        for day in plan.get("days", [])
+        if day.get("date", "") >= start
+        for meal in day.get("meals", [])
+        for ing in meal.get("ingredients", [])
+        if isinstance(ing, str)
+    )
+
+
+def pantry_supply(pantry_items):
+    """Quantity on hand per pantry item, keyed like week_demand."""
+    entries = []
+    for item in pantry_items:
+        name = normalize_name(item.get("name", ""))
+        amount, dimension = parse_quantity(item.get("qty_unit"))
+        entries.append((name, amount, dimension))
+    return aggregate(entries)
+
+
+def pantry_name_index(pantry_items):
+    """PantryIndex over every pantry name, including items without a usable
+    qty_unit ("some"), which pantry_supply leaves out."""
+    return PantryIndex([
+        {"name": name} for name in dict.fromkeys(normalize_name(item.get("name", "")) for item in pantry_items) if name
+    ])
+
+
+def _format_amount(value, dimension):
+    if dimension == MASS and value >= 1000:
+        return f"{value / 1000:.1f} kg"
+    if dimension == COUNT:
+        return f"{value:g} {DIMENSION_UNITS[COUNT]}"
+    return f"{round(value):g} {DIMENSION_UNITS[dimension]}"
+
+
+def grocery_gap(plan, pantry_items, from_date=None):
+    """Quantified shortfall per ingredient.
+
+    Returns a list of dicts {name, needed, on_hand, short, unit}, largest
+    shortfall first. Ingredients with no parseable quantity are counted as
+    fully missing only if nothing in the pantry matches them.
+    """
+    demand = week_demand(plan, from_date)
+    supply = pantry_supply(pantry_items)
+    # Items left out of supply count as covered when matched below
+    index = pantry_name_index(pantry_items)
+
+    gaps = []
+    for (name, dimension), needed in demand.items():
+        match = index.match(name)
+        on_hand = 0.0
+        if match is not None:
+            on_hand = supply.get((match["name"], dimension), 0.0)
+            if on_hand == 0.0 and (match["name"], dimension) not in supply:
+                # Same food but measured differently (e.g. "1 bag") or not at
+                # all; treat as covered
+                continue
+        short = needed - on_hand
+        if short > 0:
+            gaps.append({
+                "name": name,
+                "needed": round(needed, 1),
+                "on_hand": round(on_hand, 1),
+                "short": round(short, 1),
+                "unit": DIMENSION_UNITS[dimension],
+            })
+
+    # Unquantified ingredients ("salt", "spices") only count when absent
+    seen = {name for name, _ in demand}
+    pantry_names = PantryIndex(pantry_items)
+    for day in plan.get("days", []):
+        if from_date and day.get("date", "") < str(from_date):
+            continue
+        for meal in day.get("meals", []):
+            for ing in meal.get("ingredients", []):
+                name, amount, _ = split_ingredient(ing)
+                if amount is None and name and name not in seen and not pantry_names.contains(ing):
+                    seen.add(name)
+                    gaps.append({"name": name, "needed": None, "on_hand": 0.0, "short": None, "unit": None})
+
+    gaps.sort(key=lambda g: -(g["short"] or 0))
+    return gaps
+
+
+def grocery_gap_strings(plan, pantry_items, from_date=None):
+    """grocery_gap formatted for WEEKLY_PLAN_V1's summary.grocery_gap (list of strings)."""
+    dims = {unit: dim for dim, unit in DIMENSION_UNITS.items()}
+    result = []
+    for gap in grocery_gap(plan, pantry_items, from_date):
+        if gap["short"] is None:
+            result.append(gap["name"])
+        else:
+            result.append(f"{gap['name']} ({_format_amount(gap['short'], dims[gap['unit']])})")
+    return result
@@ -0,0 +1,163 @@
+"""Local nutrient-similarity substitutes for missing ingredients.
+
+data/food_composition.csv is a small bundled table of macros per 100 g
+(protein, carbs, fat, fiber) with a food category, an animal-source tag
+for diet filtering and allergen tags. It is loaded once into numpy
+arrays, and since the table is small the full food-to-food similarity
+matrix is precomputed: cosine similarity of the foods' energy split, scaled
+down when the categories differ. Finding a substitute is then a row lookup
+over the user's pantry items.
+
+suggest_meal_swaps only asks the model when no pantry item clears
+SWAP_SIMILARITY_THRESHOLD.
+"""
+import csv
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from ingredient_matcher import PantryIndex, normalize_tokens
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "food_composition.csv")
+
+SWAP_SIMILARITY_THRESHOLD = float(os.environ.get("SWAP_SIMILARITY_THRESHOLD", "0.92"))
+# Multiplier for candidates from another category (e.g. rice -> lentils)
+CROSS_CATEGORY_PENALTY = 0.85
+
+ALLERGENS = ["gluten", "dairy", "egg", "fish", "shellfish", "tree_nut", "peanut", "soy", "sesame"]
+
+# Free-text allergen (normalized) -> table allergen tags
+ALLERGEN_ALIASES = {
+    "gluten": ["gluten"], "wheat": ["gluten"], "celiac": ["gluten"],
+    "dairy": ["dairy"], "milk": ["dairy"], "lactose": ["dairy"], "cheese": ["dairy"],
+    "egg": ["egg"],
+    "fish": ["fish"],
+    "shellfish": ["shellfish"], "shrimp": ["shellfish"], "crab": ["shellfish"], "prawn": ["shellfish"],
+    "tree nut": ["tree_nut"], "nut": ["tree_nut", "peanut"], "almond": ["tree_nut"],
+    "walnut": ["tree_nut"], "cashew": ["tree_nut"],
+    "peanut": ["peanut"],
+    "soy": ["soy"], "soya": ["soy"],
+    "sesame": ["sesame"],
+}
+
+# Diet type (questionnaire diet_json["type"]) -> excluded sources
+DIET_EXCLUDES = {
+    "omnivore": set(),
+    "pescatarian": {"meat"},
+    "vegetarian": {"meat", "fish", "shellfish"},
+    "vegan": {"meat", "fish", "shellfish", "dairy", "egg", "bee"},
+}
+
+
+class FoodTable:
+    """The composition table as arrays plus the precomputed similarity matrix."""
+
+    def __init__(self, rows):
+        self.names = [row["name"] for row in rows]
+        self.categories = [row["category"] for row in rows]
+        self.sources = np.array([row["source"] for row in rows])
+        macros = np.array(
+            [[float(row[k]) for k in ("protein_g", "carbs_g", "fat_g", "fiber_g")] for row in rows],
+            dtype=np.float32
+        )
+        self.macros = macros
+        self.allergen_bits = np.array([
+            sum(1 << ALLERGENS.index(tag) for tag in row["allergens"].split(";") if tag)
+            for row in rows
+        ], dtype=np.int32)
+
+        # Energy split (4/4/9 kcal per g; fiber weighted lightly), unit length
+        vectors = macros * np.array([4.0, 4.0, 9.0, 2.0], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        codes = np.unique(self.categories, return_inverse=True)[1]
+        same = codes[:, None] == codes[None, :]
+        self.similarity = (vectors @ vectors.T) * np.where(same, 1.0, CROSS_CATEGORY_PENALTY).astype(np.float32)
+
+        self._exact = {" ".join(normalize_tokens(name)): i for i, name in enumerate(self.names)}
+        self._index = PantryIndex([{"name": name, "row": i} for i, name in enumerate(self.names)])
+
+    def row_of(self, name):
+        """Table row for an ingredient or pantry name, or None if unknown."""
+        row = self._exact.get(" ".join(normalize_tokens(name)))
+        if row is not None:
+            return row
+        match = self._index.match(name)
+        return None if match is None else match["row"]
+
+
+@lru_cache(maxsize=1)
+def load_table(path=TABLE_PATH):
+    with open(path, newline="", encoding="utf-8") as f:
+        return FoodTable(list(csv.DictReader(f)))
+
+
+def allergen_mask(allergens):
+    """Bit mask of table allergen tags for the questionnaire's free-text allergens."""
+    mask = 0
+    for allergen in allergens or []:
+        key = " ".join(normalize_tokens(allergen))
+        for tag in ALLERGEN_ALIASES.get(key, ALLERGEN_ALIASES.get(key.rsplit(" ", 1)[-1], [])):
+            mask |= 1 << ALLERGENS.index(tag)
+    return mask
+
+
+class SubstitutionIndex:
+    """Substitute lookup over one pantry, built once per pantry / restriction set.
+
+    Pantry items that are unknown to the table, excluded by the diet type or
+    carry one of the user's allergens are dropped up front, so each lookup
+    is one slice of the similarity matrix.
+    """
+
+    def __init__(self, pantry_items, diet_type=None, allergens=None, table=None):
+        self.table = table or load_table()
+        excluded_sources = DIET_EXCLUDES.get(str(diet_type or "omnivore").lower(), set())
+        mask = allergen_mask(allergens)
+        allergen_tokens = [frozenset(normalize_tokens(a)) for a in allergens or [] if normalize_tokens(a)]
+
+        rows, names = [], []
+        for item in pantry_items:
+            name = item.get("name", "") if isinstance(item, dict) else str(item)
+            row = self.table.row_of(name)
+            if row is None or self.table.sources[row] in excluded_sources:
+                continue
+            if self.table.allergen_bits[row] & mask:
+                continue
+            tokens = frozenset(normalize_tokens(name))
+            # Allergens the table has no tag for ("kiwi") are matched by name
+            if any(a <= tokens for a in allergen_tokens):
+                continue
+            rows.append(row)
+            names.append(name)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.names = names
+
+    def candidates(self, ingredient, k=3):
+        """Up to ``k`` (pantry_name, similarity) pairs, most similar first."""
+        row = self.table.row_of(ingredient)
+        if row is None or not len(self.rows):
+            return []
+        sims = self.table.similarity[row, self.rows]
+        # the same food under another name is not a substitute
+        sims = np.where(self.rows == row, -1.0, sims)
+        top = np.argsort(-sims)[:k]
+        return [(self.names[i], float(sims[i])) for i in top if sims[i] > 0]
+
+    def suggest(self, ingredient, threshold=None):
+        """Swap suggestion for ``ingredient`` from the pantry, or None below the threshold."""
+        threshold = SWAP_SIMILARITY_THRESHOLD if threshold is None else threshold
+        best = self.candidates(ingredient, k=1)
+        if not best or best[0][1] < threshold:
+            return None
+        name, similarity = best[0]
+        row = self.table.row_of(name)
+        protein, carbs, fat, _ = self.table.macros[row]
+        return {
+            "replacement": name,
+            "notes": (f"Closest macro profile in your pantry "
+                      f"(per 100 g: P{protein:g}/C{carbs:g}/F{fat:g})"),
+            "similarity": round(similarity, 3),
+            "source": "local",
+        }
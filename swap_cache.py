@@ -0,0 +1,138 @@
+"""Two-level cache for meal-swap suggestions.
+
+Level 1 is an in-process LRU; level 2 is the shared ``meal_swap_cache``
+table, so a swap answered for one user ("no quinoa, have rice") is reused
+by every other user with the same pantry set. Entries are keyed on the
+normalized ingredient, a fingerprint of the pantry item names and the meal
+type. Both levels expire entries SWAP_CACHE_TTL_DAYS after they were
+first stored.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import SessionLocal, MealSwapCache, upsert
+from ingredient_matcher import normalize_name
+
+SWAP_CACHE_SIZE = int(os.environ.get("SWAP_CACHE_SIZE", "2048"))
+SWAP_CACHE_TTL_DAYS = int(os.environ.get("SWAP_CACHE_TTL_DAYS", "30"))
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def normalize_ingredient(name):
+    """Canonical ingredient name (quantities, stop words and plurals removed)."""
+    return normalize_name(name) or str(name).strip().lower()
+
+
+def pantry_fingerprint(available_items):
+    """Stable hash of the pantry item names (quantities are ignored)."""
+    names = sorted({normalize_ingredient(item.get("name", "")) for item in available_items if item.get("name")})
+    return hashlib.sha1("\n".join(names).encode("utf-8")).hexdigest()[:16]
+
+
+def meal_type_of(meal_context):
+    """Best-effort meal type from a meal dict or free-text context."""
+    text = meal_context.get("time", "") if isinstance(meal_context, dict) else str(meal_context or "")
+    text = text.lower()
+    for meal_type in MEAL_TYPES:
+        if meal_type in text:
+            return meal_type
+    return "any"
+
+
+def make_key(ingredient, fingerprint, meal_type):
+    return f"{normalize_ingredient(ingredient)}|{fingerprint}|{meal_type}"
+
+
+def _expiry_cutoff():
+    return datetime.utcnow() - timedelta(days=SWAP_CACHE_TTL_DAYS)
+
+
+def _lru_get(key):
+    with _lru_lock:
+        if key in _lru:
+            value, stored_at = _lru[key]
+            if stored_at < _expiry_cutoff():
+                del _lru[key]
+                return None
+            _lru.move_to_end(key)
+            return value
+    return None
+
+
+def _lru_put(key, value, stored_at=None):
+    with _lru_lock:
+        _lru[key] = (value, stored_at or datetime.utcnow())
+        _lru.move_to_end(key)
+        while len(_lru) > SWAP_CACHE_SIZE:
+            _lru.popitem(last=False)
+
+
+def get_many(keys):
+    """Batched lookup. Returns {key: suggestion} for every key that is cached.
+
+    Misses in the LRU are resolved with a single query against the shared
+    table; hits from the table are promoted into the LRU.
+    """
+    found = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        value = _lru_get(key)
+        if value is not None:
+            found[key] = value
+        else:
+            missing.append(key)
+
+    if missing:
+        db = SessionLocal()
+        try:
+            rows = db.query(MealSwapCache).filter(
+                MealSwapCache.cache_key.in_(missing),
+                MealSwapCache.created_at >= _expiry_cutoff()
+            ).all()
+            for row in rows:
+                found[row.cache_key] = row.suggestion_json
+                # keep the row's age so the entry expires with it
+                _lru_put(row.cache_key, row.suggestion_json, row.created_at)
+        finally:
+            db.close()
+    return found
+
+
+def put(key, suggestion):
+    """Store a suggestion in both levels."""
+    _lru_put(key, suggestion)
+    ingredient, fingerprint, meal_type = key.split("|", 2)
+    db = SessionLocal()
+    try:
+        # ON CONFLICT: workers storing the same swap at once do not collide
+        upsert(db, MealSwapCache, ("cache_key",), {
+            "cache_key": key,
+            "ingredient": ingredient,
+            "pantry_fingerprint": fingerprint,
+            "meal_type": meal_type,
+            "suggestion_json": suggestion,
+            "created_at": datetime.utcnow(),
+        })
+        db.commit()
+    except SQLAlchemyError as e:
+        # The suggestion is still served from the LRU; only sharing it failed
+        db.rollback()
+        logging.warning(f"Could not store meal swap {key}: {e}")
+    finally:
+        db.close()
+
+
+def clear_local():
+    """Drop the in-process level (the shared table is left untouched)."""
+    with _lru_lock:
+        _lru.clear()
@@ -0,0 +1,256 @@
+"""Rolling training-load state per user.
+
+Each adherence save folds one session into exponentially weighted moving
+averages, so the state is O(1) to update and to read:
+
+    session load  = RPE x workout minutes (0 on rest / skipped days)
+    acute load    = EWMA over ~7 days
+    chronic load  = EWMA over ~28 days
+    ACWR          = acute / chronic
+    soreness      = fast (~3 logs) and slow (~14 logs) EWMA; their
+                    difference is the soreness trend
+
+Triggers only fire after a warm-up: the load ratio needs MIN_DAYS_FOR_ACWR
+logged days (a full chronic window) and the soreness rules
+MIN_LOGS_FOR_SORENESS, so neither a sore first log nor the EWMAs filling
+up at different speeds can cut the plan. ``python training_load.py``
+checks that steady training never trips the load ratio. Threshold change: the count rule this replaced
+fired on 2 of the last 3 logs at soreness >= 8; the fast EWMA >= 7 fires
+on two such logs too, but also on one very sore day after mild ones
+(5, 5, 9), and never before the third log.
+
+Days without a log count as zero load. Re-saving the latest day swaps its
+contribution out; saving a day older than the latest one replays the
+user's history with rebuild_load().
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from database import AdherenceLog, TrainingLoad
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+SORENESS_FAST = 3
+SORENESS_SLOW = 14
+
+ACWR_HIGH = 1.5
+SORENESS_HIGH = 7.0
+SORENESS_RISING = 2.0
+# Both averages start at 0 and the acute one fills about four times faster,
+# so for the first couple of weeks a steady user reads as a load spike
+# (constant daily load gives ACWR 2.2 on day 7, still 1.5 on day 15). By
+# CHRONIC_DAYS logs the ratio of a steady load has settled near 1.
+MIN_DAYS_FOR_ACWR = CHRONIC_DAYS
+# The first log seeds both soreness averages, so a single entry would trip
+# SORENESS_HIGH on its own
+MIN_LOGS_FOR_SORENESS = 3
+# Used for logs saved before session_load was recorded
+DEFAULT_SESSION_MIN = 45
+
+
+STATE_FIELDS = ("acute_load", "chronic_load", "soreness_fast", "soreness_slow",
+                "last_date", "last_load", "last_soreness", "days_logged")
+
+
+def _alpha(span):
+    return 2.0 / (span + 1)
+
+
+A_ACUTE = _alpha(ACUTE_DAYS)
+A_CHRONIC = _alpha(CHRONIC_DAYS)
+A_SORE_FAST = _alpha(SORENESS_FAST)
+A_SORE_SLOW = _alpha(SORENESS_SLOW)
+
+
+def session_load(workout_done, rpe, duration_min):
+    """Session-RPE load for one day."""
+    if not workout_done or not rpe:
+        return 0.0
+    return float(rpe) * float(duration_min or 0)
+
+
+def acwr(state):
+    """Acute:chronic workload ratio, or None while there is too little history."""
+    if state is None or not state.chronic_load or (state.days_logged or 0) < MIN_DAYS_FOR_ACWR:
+        return None
+    return state.acute_load / state.chronic_load
+
+
+def soreness_trend(state):
+    if state is None or state.soreness_fast is None or state.soreness_slow is None:
+        return 0.0
+    return state.soreness_fast - state.soreness_slow
+
+
+def _advance(state, log_date, load, soreness):
+    """Fold a log for a day after state.last_date into the averages."""
+    gap = (log_date - state.last_date).days if state.last_date else 1
+    # Unlogged days in between carry zero load
+    state.acute_load = state.acute_load * (1 - A_ACUTE) ** gap + A_ACUTE * load
+    state.chronic_load = state.chronic_load * (1 - A_CHRONIC) ** gap + A_CHRONIC * load
+    if soreness is not None:
+        if state.soreness_fast is None:
+            state.soreness_fast = state.soreness_slow = float(soreness)
+        else:
+            state.soreness_fast += A_SORE_FAST * (soreness - state.soreness_fast)
+            state.soreness_slow += A_SORE_SLOW * (soreness - state.soreness_slow)
+    state.last_date = log_date
+    state.last_load = load
+    state.last_soreness = soreness
+    state.days_logged = (state.days_logged or 0) + 1
+
+
+def state_as_of(state, on):
+    """Copy of ``state`` with the loads decayed through ``on`` (no logs since last_date).
+
+    For evaluating stored states on a later day, e.g. the nightly sweep.
+    """
+    projected = SimpleNamespace(**{key: getattr(state, key) for key in STATE_FIELDS})
+    if projected.last_date is not None and on > projected.last_date:
+        gap = (on - projected.last_date).days
+        projected.acute_load *= (1 - A_ACUTE) ** gap
+        projected.chronic_load *= (1 - A_CHRONIC) ** gap
+    return projected
+
+
+def _replace_last(state, load, soreness):
+    """Swap the latest day's contribution for an edited log of the same day."""
+    state.acute_load += A_ACUTE * (load - state.last_load)
+    state.chronic_load += A_CHRONIC * (load - state.last_load)
+    if soreness is not None and state.last_soreness is not None:
+        state.soreness_fast += A_SORE_FAST * (soreness - state.last_soreness)
+        state.soreness_slow += A_SORE_SLOW * (soreness - state.last_soreness)
+    elif soreness is not None:
+        # soreness was missing before; treat it as a new observation
+        if state.soreness_fast is None:
+            state.soreness_fast = state.soreness_slow = float(soreness)
+        else:
+            state.soreness_fast += A_SORE_FAST * (soreness - state.soreness_fast)
+            state.soreness_slow += A_SORE_SLOW * (soreness - state.soreness_slow)
+    state.last_load = load
+    state.last_soreness = soreness
+
+
+def get_load(db, user_id):
+    """The user's load state row (single primary-key read), or None."""
+    return db.get(TrainingLoad, user_id)
+
+
+def _get_or_create(db, user_id):
+    state = get_load(db, user_id)
+    if state is None:
+        state = TrainingLoad(
+            user_id=user_id,
+            acute_load=0.0,
+            chronic_load=0.0,
+            last_load=0.0,
+            days_logged=0,
+            version=0
+        )
+        db.add(state)
+        # flush so later get_load() calls in this session find the row
+        db.flush()
+    return state
+
+
+def _snapshot(state):
+    return tuple(getattr(state, key) for key in STATE_FIELDS)
+
+
+def update_load(db, user_id, log_date, load, soreness):
+    """Fold one adherence save into the user's load state. Caller commits.
+
+    ``state.version`` only moves when the save changed something, so
+    re-saving an identical log keeps the version (and any memoized
+    adaptation decision keyed on it).
+    """
+    state = _get_or_create(db, user_id)
+    before = _snapshot(state)
+
+    if state.last_date is None or log_date > state.last_date:
+        _advance(state, log_date, load, soreness)
+    elif log_date == state.last_date:
+        _replace_last(state, load, soreness)
+    else:
+        # Backfilled an older day; the averages have to be replayed
+        db.flush()
+        return rebuild_load(db, user_id)
+
+    if _snapshot(state) != before:
+        state.version = (state.version or 0) + 1
+        state.updated_at = datetime.utcnow()
+    return state
+
+
+def rebuild_load(db, user_id):
+    """Recompute the load state from the full adherence history. Caller commits."""
+    state = _get_or_create(db, user_id)
+    if state.last_date is not None:
+        state.acute_load = state.chronic_load = state.last_load = 0.0
+        state.soreness_fast = state.soreness_slow = state.last_soreness = None
+        state.last_date = None
+        state.days_logged = 0
+
+    logs = db.query(AdherenceLog).filter(
+        AdherenceLog.user_id == user_id
+    ).order_by(AdherenceLog.date, AdherenceLog.id).all()
+    for log in logs:
+        load = log.session_load
+        if load is None:
+            load = session_load(log.workout_done, log.rpe, DEFAULT_SESSION_MIN)
+        if state.last_date == log.date:
+            _replace_last(state, load, log.soreness)
+        else:
+            _advance(state, log.date, load, log.soreness)
+
+    state.version = (state.version or 0) + 1
+    state.updated_at = datetime.utcnow()
+    return state
+
+
+def load_triggers(state):
+    """Kinds of adaptation trigger raised by a load state: a tuple drawn from
+    ("acwr", "soreness_high", "soreness_rising"), empty if none."""
+    triggers = []
+    if state is None:
+        return ()
+    ratio = acwr(state)
+    if ratio is not None and ratio >= ACWR_HIGH:
+        triggers.append("acwr")
+    if (state.days_logged or 0) >= MIN_LOGS_FOR_SORENESS:
+        if state.soreness_fast is not None and state.soreness_fast >= SORENESS_HIGH:
+            triggers.append("soreness_high")
+        elif soreness_trend(state) >= SORENESS_RISING:
+            triggers.append("soreness_rising")
+    return tuple(triggers)
+
+
+def load_reasons(state):
+    """Adaptation triggers raised by a load state, as messages (empty list if none)."""
+    reasons = []
+    for trigger in load_triggers(state):
+        if trigger == "acwr":
+            reasons.append(f"Acute:chronic training load ratio {acwr(state):.2f} indicates a load spike")
+        elif trigger == "soreness_high":
+            reasons.append("High soreness detected in recent workouts")
+        else:
+            reasons.append("Soreness trending up over recent workouts")
+    return reasons
+
+
+def _check_steady_load(days=180):
+    """Assert that training on a fixed schedule at a fixed load never trips ACWR."""
+    start = datetime(2026, 1, 1).date()
+    for every in (1, 2, 3):
+        state = SimpleNamespace(acute_load=0.0, chronic_load=0.0, soreness_fast=None, soreness_slow=None,
+                                last_date=None, last_load=0.0, last_soreness=None, days_logged=0)
+        for day in range(0, days, every):
+            _advance(state, start + timedelta(days=day), 300.0, 3)
+            assert "acwr" not in load_triggers(state), (
+                f"steady load every {every} day(s) tripped ACWR {acwr(state):.2f} on log {state.days_logged}"
+            )
+    print("steady load check passed")
+
+
+if __name__ == "__main__":
+    _check_steady_load()
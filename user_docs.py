@@ -0,0 +1,130 @@
+"""Read-through cache of each user's setup documents.
+
+The onboarding, equipment, pantry, schedule, weekly plan and settings pages
+read the user's Questionnaire, Equipment, Pantry and Availability rows at the
+top of every Streamlit rerun, i.e. on every widget interaction. get_doc()
+serves those reads from a process-wide LRU keyed by (kind, user_id).
+
+Each entry remembers the (id, updated_at) of the row it was built from.
+Entries are revalidated per user: one UNION ALL query reads the
+(id, updated_at) of all four of the user's rows, and that result is reused
+for USER_DOC_REVALIDATE_SECONDS, so a rerun that reads four documents costs
+at most one small query, and none when it follows another rerun closely. A
+save from another process, the adaptation sweep or a raw UPDATE is seen
+within that window; database.upsert() and ORM updates both set updated_at.
+invalidate() drops the entries and the user's stamps after this process's
+own saves, so those are seen immediately. A missing row is cached too (as
+None).
+
+Cached values are read-only snapshots of the row's columns, not ORM rows.
+Pages keep and mutate the lists taken from them, so the JSON columns are
+stored serialized and parsed afresh on every get_doc(), which is much
+cheaper than deep-copying them. Save paths write with
+database.upsert_user_doc().
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from sqlalchemy import literal, select, union_all
+
+from database import Questionnaire, Equipment, Pantry, Availability
+
+USER_DOC_CACHE_SIZE = int(os.environ.get("USER_DOC_CACHE_SIZE", "2048"))
+USER_DOC_REVALIDATE_SECONDS = float(os.environ.get("USER_DOC_REVALIDATE_SECONDS", "2"))
+
+DOC_MODELS = {
+    "questionnaire": Questionnaire,
+    "equipment": Equipment,
+    "pantry": Pantry,
+    "availability": Availability,
+}
+
+_docs = OrderedDict()
+# user_id -> (monotonic time checked, {kind: stamp}); bounded like _docs
+_stamps = OrderedDict()
+_docs_lock = threading.Lock()
+
+
+def _stamp(row):
+    return None if row is None else (row.id, row.updated_at)
+
+
+def _entry(row):
+    """(stamp, scalar columns, JSON columns serialized) for ``row``."""
+    if row is None:
+        return (None, None, None)
+    scalars, docs = {}, {}
+    for c in row.__table__.columns:
+        value = getattr(row, c.key)
+        (docs if isinstance(value, (dict, list)) else scalars)[c.key] = value
+    return (_stamp(row), scalars, json.dumps(docs))
+
+
+def _snapshot(entry):
+    _, scalars, docs = entry
+    if scalars is None:
+        return None
+    return SimpleNamespace(**scalars, **json.loads(docs))
+
+
+def load_row(db, kind, user_id):
+    """The user's ORM row for ``kind``, or None."""
+    model = DOC_MODELS[kind]
+    return db.query(model).filter(model.user_id == user_id).first()
+
+
+def _current_stamps(db, user_id):
+    """{kind: (id, updated_at) or None} for the user's rows, re-read at most
+    every USER_DOC_REVALIDATE_SECONDS."""
+    now = time.monotonic()
+    with _docs_lock:
+        cached = _stamps.get(user_id)
+        if cached is not None and now - cached[0] < USER_DOC_REVALIDATE_SECONDS:
+            return cached[1]
+
+    query = union_all(*(
+        select(literal(kind).label("kind"), model.id, model.updated_at).where(model.user_id == user_id)
+        for kind, model in DOC_MODELS.items()
+    ))
+    # user_id is unique in each table: at most one row per kind
+    stamps = dict.fromkeys(DOC_MODELS)
+    stamps.update((kind, (row_id, updated_at)) for kind, row_id, updated_at in db.execute(query))
+    with _docs_lock:
+        _stamps[user_id] = (now, stamps)
+        _stamps.move_to_end(user_id)
+        while len(_stamps) > USER_DOC_CACHE_SIZE:
+            _stamps.popitem(last=False)
+    return stamps
+
+
+def get_doc(db, kind, user_id):
+    """Snapshot of the user's ``kind`` row (attribute access like the row), or None."""
+    key = (kind, user_id)
+    stamp = _current_stamps(db, user_id)[kind]
+    with _docs_lock:
+        entry = _docs.get(key)
+        fresh = entry is not None and entry[0] == stamp
+        if fresh:
+            _docs.move_to_end(key)
+    if fresh:
+        return _snapshot(entry)
+
+    entry = _entry(load_row(db, kind, user_id))
+    with _docs_lock:
+        _docs[key] = entry
+        _docs.move_to_end(key)
+        while len(_docs) > USER_DOC_CACHE_SIZE:
+            _docs.popitem(last=False)
+    return _snapshot(entry)
+
+
+def invalidate(user_id, *kinds):
+    """Drop the cached ``kinds`` (all kinds if none given) for ``user_id``. Call after commit."""
+    with _docs_lock:
+        _stamps.pop(user_id, None)
+        for kind in kinds or DOC_MODELS:
+            _docs.pop((kind, user_id), None)